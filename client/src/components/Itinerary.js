@@ -7,13 +7,15 @@ const Itinerary = ({itinerary_key}) => {
   const [showTextbox, setShowTextbox] = useState(false);
   const [input, setInput] = useState('');
   const [count, setCount] = useState(0);
+  const [editStatus, setEditStatus] = useState('');
+  const [editOutput, setEditOutput] = useState('');
   const navigate = useNavigate();
 
   useEffect(() => {
     console.log("Itinerary key:", itinerary_key);
     const fetchData = async () => {
       try {
-        const res = await fetch("http://localhost:5001/generate_itinerary/" + itinerary_key);
+        const res = await fetch("http://localhost:5001/generate_itinerary/" + itinerary_key + "?trip_id=" + (sessionStorage.getItem('tripId') || ''));
         const data = await res.json();
         console.log('Form data received:', data);
         setAllData([data]);
@@ -41,25 +43,62 @@ const Itinerary = ({itinerary_key}) => {
     }
 
     const formData = {input: input};
+    setEditStatus('Sending...');
+    setEditOutput('');
 
     try {
-      const response = await fetch('http://localhost:5001/chatbot/' + itinerary_key, {
+      // The edit streams back as server-sent events, so show it as it's written
+      const response = await fetch('http://localhost:5001/chatbot/' + itinerary_key + '/stream?trip_id=' + (sessionStorage.getItem('tripId') || ''), {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify(formData),
       });
+      if (!response.ok) {
+        throw new Error(`Server error: ${response.status}`);
+      }
 
-      
-      const result = await response.json();
-      console.log('Submission successful:', result);
-      setCount(count + 1);
-
-      setInput(''); 
-      setShowTextbox(false);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const frames = buffer.split('\n\n');
+        buffer = frames.pop();
+        for (const frame of frames) {
+          let event = 'message';
+          let data = '';
+          frame.split('\n').forEach((line) => {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          });
+          if (!data) continue;
+          const payload = JSON.parse(data);
+
+          if (event === 'status') {
+            setEditStatus(payload.message);
+          } else if (event === 'delta') {
+            setEditOutput((prev) => prev + payload.text);
+          } else if (event === 'done') {
+            console.log('Submission successful:', payload.ops);
+            setAllData([payload.itinerary]);
+            setCount(count + 1);
+            setInput('');
+            setEditStatus('');
+            setEditOutput('');
+            setShowTextbox(false);
+          } else if (event === 'error') {
+            throw new Error(payload.error);
+          }
+        }
+      }
     } catch (error) {
       console.error('Error submitting form:', error);
+      setEditStatus('Something went wrong, please try again.');
     }
   };
 
@@ -183,6 +222,12 @@ const Itinerary = ({itinerary_key}) => {
             onChange={(e) => setInput(e.target.value)}
             autoFocus
           ></textarea>
+          {editStatus && (
+            <p className="mt-2 text-sm italic text-gray-500">{editStatus}</p>
+          )}
+          {editOutput && (
+            <pre className="mt-1 max-h-16 overflow-y-auto text-xs text-gray-500 whitespace-pre-wrap">{editOutput}</pre>
+          )}
           <button
               type="submit"
               className="mt-4 px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700 focus:outline-none focus:ring-2 focus:ring-blue-400"
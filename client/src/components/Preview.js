@@ -9,7 +9,7 @@ const Preview = ({itinerary_key}) => {
     console.log("Itinerary key:", itinerary_key);
     const fetchData = async () => {
       try {
-        const res = await fetch("http://localhost:5001/generate_itinerary/" + itinerary_key);
+        const res = await fetch("http://localhost:5001/generate_itinerary/" + itinerary_key + "?trip_id=" + (sessionStorage.getItem('tripId') || ''));
         const data = await res.json();
         console.log('Form data received:', data);
         setAllData([data]);
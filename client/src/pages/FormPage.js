@@ -4,6 +4,33 @@ import beachImage from '../assets/beach_img.jpeg';
 import DatePicker from 'react-datepicker';
 import 'react-datepicker/dist/react-datepicker.css';
 
+const STAGE_LABELS = {
+  queued: 'Waiting for a planner...',
+  running: 'Reading your request...',
+  preferences_extracted: 'Finding airports...',
+  geocoded: 'Found your destination...',
+  pois_fetched: 'Found things to do...',
+  flights_found: 'Found flights...',
+  hotels_found: 'Found hotels...',
+  itinerary_scheduled: 'Scheduling your days...',
+  done: 'Done!',
+};
+
+// Polling fallback for when the event stream can't be opened
+async function pollJob(jobId) {
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 2000));
+    const jobResponse = await fetch('http://localhost:5001/jobs/' + jobId);
+    const job = await jobResponse.json();
+    if (!jobResponse.ok || job.status === 'failed') {
+      throw new Error(`Planning failed: ${job.error}`);
+    }
+    if (job.status === 'done') {
+      return;
+    }
+  }
+}
+
 function FormPage() {
   const [from, setFrom] = useState('');
   const [to, setTo] = useState('');
@@ -15,6 +42,36 @@ function FormPage() {
   const today = new Date();
   const navigate = useNavigate();
 
+  const waitForJob = (jobId) => new Promise((resolve, reject) => {
+    if (!window.EventSource) {
+      pollJob(jobId).then(resolve, reject);
+      return;
+    }
+    const source = new EventSource('http://localhost:5001/jobs/' + jobId + '/events');
+    let finished = false;
+    const finish = (callback) => {
+      finished = true;
+      source.close();
+      callback();
+    };
+
+    Object.keys(STAGE_LABELS).forEach((stage) => {
+      source.addEventListener(stage, () => setButtonText(STAGE_LABELS[stage]));
+    });
+    source.addEventListener('done', () => finish(resolve));
+    source.addEventListener('failed', (event) => {
+      const job = JSON.parse(event.data);
+      finish(() => reject(new Error(`Planning failed: ${job.error}`)));
+    });
+    source.onerror = () => {
+      // EventSource retries on its own while the server is reachable; give up on
+      // the stream only if it was closed for good
+      if (!finished && source.readyState === EventSource.CLOSED) {
+        finish(() => pollJob(jobId).then(resolve, reject));
+      }
+    };
+  });
+
   const handleSubmit = async (e) => {
     e.preventDefault();
 
@@ -66,6 +123,11 @@ function FormPage() {
 
         const result = await response.json();
         console.log('Server response:', result);
+
+        // Planning runs in the background; follow its progress until it finishes
+        setButtonText(STAGE_LABELS[result.status] || 'Planning...');
+        await waitForJob(result.job_id);
+        sessionStorage.setItem('tripId', result.trip_id);
         navigate('/previews');
       } catch (error) {
         console.error('Error details:', error);
@@ -1,10 +1,75 @@
+import json
 import logging
-import google.generativeai as genai
-import os
 import dotenv
+from app.utils.gemini import get_model
 dotenv.load_dotenv() 
 logger = logging.getLogger(__name__)
 
+PATCH_PROMPT = """
+You are an autonomous travel itinerary editor.
+
+Below is one itinerary. Each day is a list of numbered lines (activities and
+meals); other fields are single blocks of text. Apply the user's request by
+returning only the edits, as JSON:
+{{"ops": [{{"op": "add" | "remove" | "replace", "path": "...", "value": "..."}}]}}
+
+Paths:
+- "/Day 2/3" is line 3 (zero-based) of Day 2; use "/Day 2/-" with "add" to append.
+- "/Day 4" with "add" creates a new day; "value" is the whole day as lines separated by \\n.
+- "/Hotels" or "/Flights" with "replace" rewrites that field.
+"remove" takes no value. Indexes refer to the itinerary as shown, before any of your ops.
+Only touch what the user asked to change, and keep new lines in the same style as
+existing ones, e.g. "Name (60 minutes, website: https://...)".
+Do not ask for more info; if the request is vague, invent a realistic, relevant entry.
+{preferences}
+
+Itinerary:
+{itinerary}
+
+User request:
+"{user_message}"
+"""
+
+
+def render_for_patch(itinerary: dict) -> str:
+    """Show days as numbered lines so the model can address them by index."""
+    blocks = []
+    for field, value in itinerary.items():
+        if field.startswith("Day "):
+            lines = [line for line in str(value).split("\n") if line]
+            blocks.append(f"{field}:\n" + "\n".join(f"  [{i}] {line}" for i, line in enumerate(lines)))
+        else:
+            blocks.append(f"{field}:\n  " + str(value).strip().replace("\n", "\n  "))
+    return "\n\n".join(blocks)
+
+
+def stream_itinerary_patch(itinerary_json: dict, user_message: str, preferences: dict):
+    """
+    Ask Gemini for the edits a request needs rather than a regenerated itinerary.
+
+    Yields the JSON patch text as Gemini generates it; the joined chunks parse
+    to {"ops": [...]} for itinerary_patch.apply_patch.
+    """
+    prompt = PATCH_PROMPT.format(
+        preferences=f"Traveller preferences: {json.dumps(preferences)}" if preferences else "",
+        itinerary=render_for_patch(itinerary_json),
+        user_message=user_message
+    )
+    agent = get_model()
+    response = agent.generate_content(
+        prompt, generation_config={"response_mime_type": "application/json"}, stream=True
+    )
+    for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+
+def edit_itinerary_patch(itinerary_json: dict, user_message: str, preferences: dict):
+    """Patch ops for a request, once Gemini has finished generating them."""
+    text = "".join(stream_itinerary_patch(itinerary_json, user_message, preferences))
+    return json.loads(text).get("ops", [])
+
+
 def edit_itinerary(itinerary_json: dict, user_message: str, preferences: dict):
     system_prompt = """
 You are an autonomous travel itinerary editor.
@@ -41,8 +106,7 @@ Please apply the following user request:
 "{user_message}"
 """
     try:
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        agent = genai.GenerativeModel("gemini-2.5-flash-preview-05-20")
+        agent = get_model()
         updated = agent.generate_content(system_prompt + prompt)
         return updated.text
     except Exception as e:
@@ -1,7 +1,8 @@
 import json
-import requests
 import os
 import dotenv
+from app.utils import amadeus_auth, http_client
+from app.utils.geocode_cache import cached_geocode
 
 dotenv.load_dotenv()
 
@@ -17,45 +18,39 @@ def get_input():
 # integrating opencage geocoder api to find the latitude and longitude of any given location
 
 def get_lat_lng_opencage(location):
+    coords = cached_geocode(location, geocode_opencage)
+    if coords:
+        return coords["lat"], coords["lon"]
+    return None
+
+def geocode_opencage(location):
     api_key = os.getenv("ORS_API_KEY")
     url = "https://api.opencagedata.com/geocode/v1/json"
     params = {
         "q": location,
         "key": api_key
     }
-    response = requests.get(url, params=params).json()
+    response = http_client.get(url, params=params).json()
     if response["results"]:
         lat = response["results"][0]["geometry"]["lat"]
         lng = response["results"][0]["geometry"]["lng"]
-        return lat, lng
+        return {"lat": lat, "lon": lng}
     else:
         return None
 
 # Getting data of the best locations to visit and their activities
 
 def get_access_token(client_id: str, client_secret: str) -> str:
-    url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": client_id,
-        "client_secret": client_secret
-    }
-    response = requests.post(url, headers=headers, data=data)
-    response.raise_for_status()
-    return response.json()['access_token']
+    return amadeus_auth.get_access_token(client_id, client_secret)
 
 def get_tours_and_activities(access_token: str, latitude: float, longitude: float, radius: int = 1):
     url = "https://test.api.amadeus.com/v1/shopping/activities"
-    headers = {
-        "Authorization": f"Bearer {access_token}"
-    }
     params = {
         "latitude": latitude,
         "longitude": longitude,
         "radius": radius
     }
-    response = requests.get(url, headers=headers, params=params)
+    response = amadeus_auth.get(url, access_token, params=params)
     response.raise_for_status()
     print(json.dumps(response.json(), indent=4))
     return response.json()
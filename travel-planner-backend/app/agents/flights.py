@@ -1,6 +1,6 @@
-import requests
 import os
 import dotenv
+from app.utils import amadeus_auth
 
 dotenv.load_dotenv()
 
@@ -8,22 +8,11 @@ API_KEY = os.getenv("AMADEUS_API_KEY")
 API_SECRET = os.getenv("AMADEUS_API_SECRET")
 
 def get_access_token(api_key, api_secret):
-    url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-    payload = {
-        'grant_type': 'client_credentials',
-        'client_id': api_key,
-        'client_secret': api_secret
-    }
-    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    response = requests.post(url, data=payload, headers=headers)
-    response.raise_for_status()
-    token = response.json()['access_token']
-    return token
+    return amadeus_auth.get_access_token(api_key, api_secret)
 
 def search_flights(origin, destination, departure_date, access_token):
     url = "https://test.api.amadeus.com/v2/shopping/flight-offers"
     headers = {
-        "Authorization": f"Bearer {access_token}",
         "Accept": "application/json"
     }
     params = {
@@ -33,7 +22,7 @@ def search_flights(origin, destination, departure_date, access_token):
         "adults": 1,
         "max": 5  # limit results for demo
     }
-    response = requests.get(url, headers=headers, params=params)
+    response = amadeus_auth.get(url, access_token, headers=headers, params=params)
     response.raise_for_status()
     return response.json()
 
@@ -1,9 +1,11 @@
 from typing import Dict, Any, List
 import json
 import logging
-import google.generativeai as genai
-import os
 from dotenv import load_dotenv
+from app.utils.llm_cache import cached_llm_result
+from app.utils import airports
+from app.utils.gemini import DEFAULT_MODEL, get_model
+from . import hotel_agent
 
 logger = logging.getLogger(__name__)
 load_dotenv()
@@ -17,15 +19,9 @@ class GoalAgent:
     
     def __init__(self):
         """
-        Initialize the GoalAgent with Gemini API.
+        Initialize the GoalAgent. The Gemini client is set up on first use.
         """
-        # Load environment variables
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
-            
-        genai.configure(api_key=api_key)
-        self.gemini = genai.GenerativeModel("gemini-2.5-flash-preview-05-20")
+        self.model_name = DEFAULT_MODEL
         
         # Define response schemas
         self.response_schemas = [
@@ -82,19 +78,118 @@ Now process this user input:
 {user_input}
 """
 
+        # One call that answers everything a trip submission needs: airports for
+        # both ends plus the preferences above, so no stage has to ask again
+        self.trip_prompt = """
+You are a travel preferences parser and airport resolver.
+
+1. For the origin and the destination, give only the primary, major international
+   airport codes (IATA 3-letter codes) serving that city or region. If a city has
+   several major airports (e.g. New York) include all of them: ["JFK", "EWR", "LGA"].
+   If one is dominant (e.g. London) give only that one: ["LHR"]. If the place is
+   ambiguous or has no well-known airport, give [].
+2. From the trip description, return relevant (key, value) tag pairs that exist in
+   OpenStreetMap, like ("shop", "mall") or ("tourism", "attraction"), and extract
+   any budget, accommodation, dietary, activity, and constraint preferences.
+
+Return JSON with exactly these fields:
+{{
+    "origin_airports": ["IATA"],
+    "destination_airports": ["IATA"],
+    "osm_tags": [["key", "value"], ["key", "value"]],
+    "budget": {{"min": float, "max": float}},
+    "accommodation": "preference",
+    "dietary": "restrictions",
+    "activities": [list of activities],
+    "constraints": [list of constraints]
+}}
+
+Origin: {origin}
+Destination: {destination}
+Trip description: {user_input}
+"""
+
             
 
 
+    @property
+    def gemini(self):
+        """Shared Gemini model, created (and the API key checked) on first use."""
+        return get_model(self.model_name)
+
     def extract(self, user_input: str) -> Dict[str, Any]:
         """
         Extract user preferences from natural language input.
         
+        Parsed results are cached by a hash of the prompt and normalized input,
+        so repeat queries skip Gemini entirely.
+        
         Args:
             user_input: User's natural language description of preferences
             
         Returns:
             Dictionary containing extracted preferences
         """
+        return cached_llm_result(
+            self.model_name, self.system_prompt, user_input,
+            lambda: self._extract_uncached(user_input)
+        )
+
+    def extract_trip(self, origin: str, destination: str, user_input: str) -> Dict[str, Any]:
+        """
+        Resolve both airports and extract preferences for one trip submission.
+
+        The bundled airport index answers most origins and destinations; the
+        preferences and any airports it can't resolve come from a single
+        structured Gemini call, cached like extract().
+
+        Args:
+            origin: Place the traveller departs from
+            destination: Place the traveller is going to
+            user_input: User's natural language description of preferences
+
+        Returns:
+            Dictionary with "origin_airports" and "destination_airports"
+            ({code: {"lat", "lon"}}) and "preferences" (as returned by extract)
+        """
+        parsed = cached_llm_result(
+            self.model_name, self.trip_prompt, "\0".join([origin, destination, user_input]),
+            lambda: self._extract_trip_uncached(origin, destination, user_input)
+        )
+        preferences = {field: parsed[field] for field in self.response_schemas}
+        preferences['themes'] = self._extract_themes_from_tags(preferences['osm_tags'])
+        return {
+            "origin_airports": self._resolve_airports(origin, parsed['origin_airports']),
+            "destination_airports": self._resolve_airports(destination, parsed['destination_airports']),
+            "preferences": preferences
+        }
+
+    def _extract_trip_uncached(self, origin: str, destination: str, user_input: str) -> Dict[str, Any]:
+        prompt = self.trip_prompt.format(origin=origin, destination=destination, user_input=user_input)
+        response = self.gemini.generate_content(
+            prompt, generation_config={"response_mime_type": "application/json"}
+        )
+        try:
+            data = json.loads(response.text)
+        except (json.JSONDecodeError, ValueError):
+            logger.error(f"Invalid JSON response: {getattr(response, 'text', None)}")
+            raise ValueError("Failed to parse JSON response")
+
+        for field in self.response_schemas + ["origin_airports", "destination_airports"]:
+            if field not in data:
+                raise ValueError(f"Missing required field: {field}")
+        return data
+
+    @staticmethod
+    def _resolve_airports(place: str, llm_codes: List[str]) -> Dict[str, Dict[str, float]]:
+        # The index is authoritative for places it knows; the model's codes are
+        # only used for the rest
+        known = airports.resolve(place)
+        if known:
+            return known
+        return hotel_agent.GoalAgent.get_lat_lon_for_airports(llm_codes or [])
+
+    def _extract_uncached(self, user_input: str) -> Dict[str, Any]:
         try:
             # Format the prompt with user input
             prompt = self.system_prompt.format(user_input=user_input)
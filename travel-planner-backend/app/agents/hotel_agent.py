@@ -1,18 +1,16 @@
 import json
 import logging
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import requests
+from app.utils import airports, amadeus_auth
+from app.utils.gemini import get_model
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 import os
 
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables")
-
-genai.configure(api_key=api_key)
+AMADEUS_LOCATIONS_URL = "https://test.api.amadeus.com/v1/reference-data/locations"
+AIRPORT_LOOKUP_WORKERS = int(os.getenv("AIRPORT_LOOKUP_WORKERS", "4"))
 
 
 class GoalAgent:
@@ -24,17 +22,8 @@ class GoalAgent:
 
     def __init__(self):
         """
-        Initialize the GoalAgent with Gemini API.
+        Initialize the GoalAgent. The Gemini client is set up on first use.
         """
-        # Load environment variables
-        # change this later
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
-
-        genai.configure(api_key=api_key)
-        self.gemini = genai.GenerativeModel("gemini-2.5-flash-preview-05-20")
-
         # Define response schemas
         self.response_schemas = [
             "budget",
@@ -65,7 +54,19 @@ class GoalAgent:
                 “Going to Oakland” → ["OAK"]
                 """
 
+    @property
+    def gemini(self):
+        """Shared Gemini model, created (and the API key checked) on first use."""
+        return get_model()
+
     def extract(self, user_input: str):
+        # Most inputs are a city from the form, which the bundled index answers
+        # without a Gemini round trip or any Amadeus lookups
+        airport_coords = airports.resolve(user_input)
+        if airport_coords:
+            return airport_coords
+
+        logger.info(f"Airport index could not resolve {user_input!r}, asking Gemini")
         response = self.gemini.generate_content(str(self.system_prompt) + str(user_input)).text
         response = response.strip().strip('`')
         airport_list = json.loads(response)
@@ -76,40 +77,47 @@ class GoalAgent:
 
     @staticmethod
     def get_lat_lon_for_airports(codes):
+        codes = list(dict.fromkeys(code.strip().upper() for code in codes))
+        if not codes:
+            return {}
+
+        # Each code is independent, so unknown ones are looked up together
+        # rather than one Amadeus round trip after another
+        with ThreadPoolExecutor(max_workers=min(len(codes), AIRPORT_LOOKUP_WORKERS)) as pool:
+            futures = {code: pool.submit(airports.cached_coordinates, code, fetch_airport_coordinates) for code in codes}
+
         coords = {}
-        url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": "notWU49gJl5MUZs5Wij73gxQX0RCj9EI",
-            "client_secret": "5WGFoGbZy57N1eUp",
-        }
-        response = requests.post(url, data=data)
-        response.raise_for_status()
-        token = response.json()["access_token"]
-
-        headers = {"Authorization": f"Bearer {token}"}
-        url = "https://test.api.amadeus.com/v1/reference-data/locations"
-
-        for code in codes:
-            params = {
-                "subType": "AIRPORT",
-                "keyword": code
-            }
-            response = requests.get(url, headers=headers, params=params)
-            if response.status_code != 200:
+        for code, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Error looking up airport {code}: {str(e)}")
                 continue
-
-            data = response.json()
-            if data["data"]:
-                # Usually the first result matches
-                airport = data["data"][0]
-                lat = float(airport["geoCode"]["latitude"])
-                lon = float(airport["geoCode"]["longitude"])
-                coords[code] = {"lat": lat, "lon": lon}
-            else:
-                print(f"No data found for {code}")
+            if result is not None:
+                coords[code] = result
         return coords
 
+
+def fetch_airport_coordinates(code):
+    params = {
+        "subType": "AIRPORT",
+        "keyword": code
+    }
+    response = amadeus_auth.get(AMADEUS_LOCATIONS_URL, params=params)
+    # Raising rather than returning None keeps a failed request out of the cache
+    response.raise_for_status()
+
+    data = response.json()
+    if not data.get("data"):
+        logger.info(f"No data found for {code}")
+        return None
+
+    # Usually the first result matches
+    airport = data["data"][0]
+    lat = float(airport["geoCode"]["latitude"])
+    lon = float(airport["geoCode"]["longitude"])
+    return {"lat": lat, "lon": lon}
+
 if __name__ == "__main__":
     goal_agent = GoalAgent()
 
@@ -1,15 +1,26 @@
 from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime, timedelta
-from math import radians, cos, sin, sqrt, atan2, asin
-import random
+import math
 from app.utils.api_wrappers import fetch_places, get_location_coordinates
-from app.agents.poi_agent import POI
+from app.agents.poi_agent import POI, POITable
+from app.utils import geo
+from app.utils.geo import haversine_matrix
+from app.utils.opening_hours import is_open, parse_opening_hours
+from app.utils.routing import plan_route
+from app.utils.spatial_index import KDTree
 
 
 def overlaps(start1, end1, start2, end2):
     return max(start1, start2) < min(end1, end2)
 
 
+def expand_visit(pois: POITable, visit: Dict[str, Any]) -> Dict[str, Any]:
+    """A scheduled visit with its POI's fields filled in, as a standalone dict."""
+    item = pois.record(visit["poi"])
+    item.update(visit)
+    return item
+
+
 class ItineraryAgent:
     def __init__(self):
         self.day_start_hour = 9
@@ -18,13 +29,24 @@ class ItineraryAgent:
         self.max_activities_per_day = 4
         self.default_walking_speed = 5.0  # km/h
         self.default_driving_speed = 40.0  # km/h
+        self.max_walking_distance = 1.5  # km; longer hops are driven
 
     def generate_itinerary(self, duration: int, start_date: datetime, activities_poi: List[POI], food_poi: List[POI], hotel_info: Dict[str, Any], user_tags: List[List[str]] = None) -> Dict[str, Any]:
+        """
+        Schedule activities and meals over duration days.
+
+        Both POI lists are packed into one POITable, returned as 'pois'. Each
+        scheduled activity or meal is a small dict of its times and 'poi', the
+        row it refers to (plus 'name' when it differs from the POI's); use
+        expand_visit to get the full record.
+        """
         hotel_location = hotel_info['location']
         booked_slots_per_day = [[] for _ in range(duration)]
 
-        activities = self._schedule_activities(activities_poi, hotel_location, duration, user_tags, booked_slots_per_day)
-        meals = self._schedule_meals(food_poi, hotel_location, duration, booked_slots_per_day)
+        pois = POITable(activities_poi)
+        food_rows = pois.extend(food_poi)
+        activities = self._schedule_activities(pois, range(food_rows.start), hotel_location, duration, user_tags, booked_slots_per_day)
+        meals = self._schedule_meals(pois, food_rows, hotel_location, duration, booked_slots_per_day, activities, start_date)
 
         itinerary = []
         for day in range(duration):
@@ -60,10 +82,11 @@ class ItineraryAgent:
             'total_activities': total_activities,
             'total_meals': total_meals,
             'total_activity_time': total_activity_time,
-            'total_meal_time': total_meal_time
+            'total_meal_time': total_meal_time,
+            'pois': pois
         }
 
-    def _calculate_duration(self, poi: POI) -> int:
+    def _calculate_duration(self, pois: POITable, row: int) -> int:
         base_durations = {
             "museum": 120,
             "attraction": 90,
@@ -76,72 +99,134 @@ class ItineraryAgent:
             "nature": 120,
             "adventure": 120
         }
-        poi_type = poi.type.lower()
+        poi_type = pois.types[row].lower()
         base_duration = base_durations.get(poi_type, 90)
-        popularity = poi.theme_score
+        popularity = pois.theme_scores[row]
         return int(base_duration * (1 + 0.2 * (popularity - 0.5)))
 
-    def _schedule_activities(self, pois: List[POI], hotel_location: Tuple[float, float], days: int, user_tags: List[List[str]], booked_slots_per_day: List[List[Tuple[int, int]]]) -> List[List[Dict[str, Any]]]:
-        user_tag_set = set(tuple(tag) for tag in user_tags)
-        relevant_pois = [poi for poi in pois if set(tuple(tag) for tag in poi.tags).intersection(user_tag_set)]
-        if not relevant_pois:
-            relevant_pois = pois[:]
-        relevant_pois.sort(key=lambda p: p.relevance_score, reverse=True)
+    def _travel_minutes(self, distance: float) -> int:
+        """Minutes to cover distance km: walking for short hops, driving beyond max_walking_distance."""
+        speed = self.default_walking_speed if distance <= self.max_walking_distance else self.default_driving_speed
+        return int(math.ceil(distance / speed * 60))
+
+    def _schedule_activities(self, pois: POITable, rows: range, hotel_location: Tuple[float, float], days: int, user_tags: List[List[str]], booked_slots_per_day: List[List[Tuple[int, int]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Pick each day's most relevant unused activities and visit them in a short loop from the hotel.
+
+        Distances between the hotel (node 0) and every candidate are computed
+        once up front. Each day's picks are ordered by nearest neighbour plus
+        2-opt, then timed with the travel time from the previous stop (at least
+        buffer_time); a stop that would run past day_end_hour is left for a
+        later day and its slot offered to the next unused candidate, with the
+        day re-routed, until max_activities_per_day fit or none remain. The hotel leg is travelled before day_start_hour, so a far
+        hotel never pushes the first stop out of the day. Visits carry
+        distance_from_hotel, distance_from_last, travel_time, distance_to_next
+        and time_to_next (km and minutes).
+        """
+        user_tag_ids = {pois.tag_id(tag[0], tag[1]) for tag in user_tags} - {None}
+        relevant_rows = [row for row in rows if user_tag_ids.intersection(pois.row_tag_ids(row))]
+        if not relevant_rows:
+            relevant_rows = list(rows)
+        relevant_rows.sort(key=pois.relevance_scores.__getitem__, reverse=True)
+
+        dist = haversine_matrix(
+            [hotel_location[0]] + [pois.lats[row] for row in relevant_rows],
+            [hotel_location[1]] + [pois.lons[row] for row in relevant_rows]
+        )
+        node_rows = [None] + relevant_rows
         used_pois = set()
         daily_activities = []
 
         for day_index in range(days):
-            schedule = []
-            current_time = self.day_start_hour * 60
-            last_location = hotel_location
-            activities_count = 0
             booked_slots = booked_slots_per_day[day_index]
+            kept, schedule, nodes, slots = [], [], [], []
+            tried_names = set()
+            # Stops dropped for running late or clashing are replaced by the next
+            # unused candidates and the day re-routed, until it is full or they run out
+            while len(kept) < self.max_activities_per_day:
+                picks = list(kept)
+                for node, row in enumerate(relevant_rows, start=1):
+                    if len(picks) >= self.max_activities_per_day:
+                        break
+                    if pois.names[row] in used_pois or pois.names[row] in tried_names:
+                        continue
+                    picks.append(node)
+                    tried_names.add(pois.names[row])
+                if len(picks) == len(kept):
+                    break
+                timed = self._time_route(pois, dist, node_rows, plan_route(dist, 0, picks), booked_slots)
+                # A longer route can push a stop that fitted before out of the day; keep the fuller plan
+                if len(timed[1]) > len(nodes):
+                    schedule, nodes, slots = timed
+                kept = list(nodes)
 
-            for poi in relevant_pois:
-                if poi.name in used_pois:
-                    continue
-
-                duration = self._calculate_duration(poi)
-                start_time = current_time + self.buffer_time
-                end_time = start_time + duration
-
-                if any(overlaps(start_time, end_time, b[0], b[1]) for b in booked_slots):
-                    continue
+            booked_slots.extend(slots)
+            used_pois.update(pois.names[node_rows[node]] for node in nodes)
 
-                activity = {
-                    "name": poi.name,
-                    "description": poi.description,
-                    "location": poi.location,
-                    "type": poi.type,
-                    "tags": poi.tags,
-                    "price": poi.price,
-                    "luxury_level": poi.luxury_level,
-                    "osm_id": poi.osm_id,
-                    "osm_type": poi.osm_type,
-                    "relevance_score": poi.relevance_score,
-                    "theme_score": poi.theme_score,
-                    "tag_score": poi.tag_score,
-                    "matched_theme": poi.matched_theme,
-                    "start_time": start_time // 60,
-                    "end_time": end_time // 60,
-                    "duration": duration,
-                    "rating": poi.rating
-                }
-
-                schedule.append(activity)
-                booked_slots.append((start_time, end_time))
-                current_time = end_time + self.buffer_time
-                last_location = poi.location
-                used_pois.add(poi.name)
-                activities_count += 1
-
-                if activities_count >= self.max_activities_per_day:
-                    break
+            # The last stop's "next" is the way back to the hotel
+            for visit, node, next_node in zip(schedule, nodes, nodes[1:] + [0]):
+                visit["distance_to_next"] = round(float(dist[node, next_node]), 3)
+                visit["time_to_next"] = self._travel_minutes(visit["distance_to_next"])
 
             daily_activities.append(schedule)
         return daily_activities
 
-    def _schedule_meals(self, restaurants: List[POI], hotel_location: Tuple[float, float], days: int, booked_slots_per_day: List[List[Tuple[int, int]]]) -> List[List[Dict[str, Any]]]:
+    def _time_route(self, pois: POITable, dist, node_rows: List[Optional[int]], order: List[int],
+                    booked_slots: List[Tuple[int, int]]) -> Tuple[List[Dict[str, Any]], List[int], List[Tuple[int, int]]]:
+        """
+        Time a day's stops in route order from day_start_hour.
+
+        Each stop waits the travel time from the previous one (at least
+        buffer_time); one that would run past day_end_hour or overlap a
+        booked slot is skipped. Visits keep the exact minute they end as
+        end_minute, since end_time is truncated to the hour. Returns the
+        visits, their nodes and their (start, end) minutes.
+        """
+        schedule, nodes, slots = [], [], []
+        current_time = self.day_start_hour * 60
+        last_node = 0
+        for node in order:
+            row = node_rows[node]
+            distance = float(dist[last_node, node])
+            travel_time = self._travel_minutes(distance)
+            duration = self._calculate_duration(pois, row)
+            wait = self.buffer_time if last_node == 0 else max(self.buffer_time, travel_time)
+            start_time = current_time + wait
+            end_time = start_time + duration
+
+            if end_time > self.day_end_hour * 60:
+                continue
+            if any(overlaps(start_time, end_time, b[0], b[1]) for b in booked_slots):
+                continue
+
+            schedule.append({
+                "poi": row,
+                "start_time": start_time // 60,
+                "end_time": end_time // 60,
+                "end_minute": end_time,
+                "duration": duration,
+                "travel_time": travel_time,
+                "distance_from_last": round(distance, 3),
+                "distance_from_hotel": round(float(dist[0, node]), 3)
+            })
+            nodes.append(node)
+            slots.append((start_time, end_time))
+            current_time = end_time + self.buffer_time
+            last_node = node
+        return schedule, nodes, slots
+
+    def _schedule_meals(self, pois: POITable, restaurants: range, hotel_location: Tuple[float, float], days: int, booked_slots_per_day: List[List[Tuple[int, int]]],
+                        daily_activities: Optional[List[List[Dict[str, Any]]]] = None, start_date: Optional[datetime] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Place breakfast, brunch (when a brunch place exists), lunch and dinner each day.
+
+        Each meal goes to the restaurant nearest to where the traveller is at
+        that time (the hotel, or the activity or meal before it) that is open
+        for the whole slot and not used yet on the trip. If every such place
+        has been used, one not used that day is allowed again. The
+        restaurants go into one KDTree per trip, so each pick is a
+        nearest-neighbour query rather than a scan.
+        """
         if restaurants:
             default_meal_times = {
                 "lunch": 13 * 60,
@@ -151,98 +236,66 @@ class ItineraryAgent:
             fixed_breakfast_time = 8 * 60
             daily_meals = []
 
+            rows = list(restaurants)
+            index = KDTree([pois.lats[row] for row in rows], [pois.lons[row] for row in rows])
+            hours = [parse_opening_hours(dict(pois.tags(row)).get("opening_hours")) for row in rows]
+            breakfast_places = {i for i, row in enumerate(rows) if "breakfast" in pois.descriptions[row].lower()}
+            brunch_places = {i for i, row in enumerate(rows) if any(pois.tag_vocab[t][1] == "brunch" for t in pois.row_tag_ids(row))}
+            used = set()
+
             for day_index in range(days):
                 day_meals = []
+                used_today = set()
                 booked_slots = booked_slots_per_day[day_index]
+                weekday = (start_date + timedelta(days=day_index)).weekday() if start_date else None
+                # (minute the traveller leaves, where) for everything already on the day
+                stops = [(visit["end_minute"], pois.location(visit["poi"]))
+                         for visit in (daily_activities[day_index] if daily_activities else [])]
+
+                def place_meal(start: int, duration: int, allowed, name_suffix: str = "") -> None:
+                    location = max((stop for stop in stops if stop[0] <= start), default=(0, hotel_location))[1]
+
+                    def fits(i: int) -> bool:
+                        return allowed(i) and (weekday is None or is_open(hours[i], weekday, start, start + duration))
+
+                    found = (index.nearest(location[0], location[1], accept=lambda i: i not in used and fits(i))
+                             or index.nearest(location[0], location[1], accept=lambda i: i not in used_today and fits(i)))
+                    if not found:
+                        return
+                    i = found[0][1]
+                    used.add(i)
+                    used_today.add(i)
+                    meal = {
+                        "poi": rows[i],
+                        "start_time": start // 60,
+                        "end_time": (start + duration) // 60,
+                        "duration": duration,
+                        "distance_from_last": round(geo.haversine_km(location[0], location[1], pois.lats[rows[i]], pois.lons[rows[i]]), 3)
+                    }
+                    if name_suffix:
+                        meal["name"] = pois.names[rows[i]] + name_suffix
+                    day_meals.append(meal)
+                    booked_slots.append((start, start + duration))
+                    stops.append((start + duration, pois.location(rows[i])))
 
                 # 🥐 Add Fixed Breakfast from 8:00–9:00 AM
-                breakfast_restaurants = [r for r in restaurants if "breakfast" in r.description.lower()]
-                breakfast_restaurant = random.choice(breakfast_restaurants) if breakfast_restaurants else random.choice(restaurants)
-
-                breakfast_info = {
-                    "name": breakfast_restaurant.name + " (Fixed Breakfast)",
-                    "description": breakfast_restaurant.description,
-                    "location": breakfast_restaurant.location,
-                    "type": breakfast_restaurant.type,
-                    "tags": breakfast_restaurant.tags,
-                    "price": breakfast_restaurant.price,
-                    "luxury_level": breakfast_restaurant.luxury_level,
-                    "osm_id": breakfast_restaurant.osm_id,
-                    "osm_type": breakfast_restaurant.osm_type,
-                    "relevance_score": breakfast_restaurant.relevance_score,
-                    "theme_score": breakfast_restaurant.theme_score,
-                    "tag_score": breakfast_restaurant.tag_score,
-                    "matched_theme": breakfast_restaurant.matched_theme,
-                    "start_time": fixed_breakfast_time // 60,
-                    "end_time": (fixed_breakfast_time + 60) // 60,
-                    "duration": 60,
-                    "rating": breakfast_restaurant.rating
-                }
-                day_meals.append(breakfast_info)
-                booked_slots.append((fixed_breakfast_time, fixed_breakfast_time + 60))
+                place_meal(fixed_breakfast_time, 60, (lambda i: i in breakfast_places) if breakfast_places else (lambda i: True),
+                           " (Fixed Breakfast)")
 
                 # ☕ Try brunch if available
-                brunch_restaurants = [r for r in restaurants if any(tag[1] == "brunch" for tag in r.tags)]
-                other_restaurants = [r for r in restaurants if not any(tag[1] == "brunch" for tag in r.tags)]
-
-                if brunch_restaurants:
-                    brunch_restaurant = random.choice(brunch_restaurants)
+                if brunch_places:
                     brunch_duration = 90
                     brunch_start = self.find_nearest_available_slot(brunch_time, brunch_duration, booked_slots)
-
                     if brunch_start is not None:
-                        brunch_info = {
-                            "name": brunch_restaurant.name,
-                            "description": brunch_restaurant.description,
-                            "location": brunch_restaurant.location,
-                            "type": brunch_restaurant.type,
-                            "tags": brunch_restaurant.tags,
-                            "osm_id": brunch_restaurant.osm_id,
-                            "osm_type": brunch_restaurant.osm_type,
-                            "relevance_score": brunch_restaurant.relevance_score,
-                            "theme_score": brunch_restaurant.theme_score,
-                            "tag_score": brunch_restaurant.tag_score,
-                            "matched_theme": brunch_restaurant.matched_theme,
-                            "start_time": brunch_start // 60,
-                            "end_time": (brunch_start + brunch_duration) // 60,
-                            "duration": brunch_duration,
-                            "rating": brunch_restaurant.rating
-                        }
-                        day_meals.append(brunch_info)
-                        booked_slots.append((brunch_start, brunch_start + brunch_duration))
+                        place_meal(brunch_start, brunch_duration, brunch_places.__contains__)
 
                 # 🍽 Schedule lunch and dinner
                 for meal_type, target_time in default_meal_times.items():
-                    if not other_restaurants:
-                        break
-
                     duration = 60
                     start_time = self.find_nearest_available_slot(target_time, duration, booked_slots)
                     if start_time is None:
                         continue
-
-                    restaurant = random.choice(other_restaurants)
-                    other_restaurants.remove(restaurant)
-
-                    meal_info = {
-                        "name": restaurant.name,
-                        "description": restaurant.description,
-                        "location": restaurant.location,
-                        "type": restaurant.type,
-                        "tags": restaurant.tags,
-                        "osm_id": restaurant.osm_id,
-                        "osm_type": restaurant.osm_type,
-                        "relevance_score": restaurant.relevance_score,
-                        "theme_score": restaurant.theme_score,
-                        "tag_score": restaurant.tag_score,
-                        "matched_theme": restaurant.matched_theme,
-                        "start_time": start_time // 60,
-                        "end_time": (start_time + duration) // 60,
-                        "duration": duration,
-                        "rating": restaurant.rating
-                    }
-                    day_meals.append(meal_info)
-                    booked_slots.append((start_time, start_time + duration))
+                    place_meal(start_time, duration, lambda i: i not in brunch_places)
 
                 daily_meals.append(day_meals)
             return daily_meals
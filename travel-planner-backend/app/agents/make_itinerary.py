@@ -2,13 +2,29 @@ from . import flights
 from . import hotels
 import random
 from . import hotel_agent
+from . import goal_agent
 from . import trip_planner_agent
 import json
 import os
+import time
+import logging
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Upper bound in seconds for each independent stage when running concurrently
+STAGE_TIMEOUTS = {
+    "flights": float(os.getenv("FLIGHT_STAGE_TIMEOUT", "60")),
+    "hotels": float(os.getenv("HOTEL_STAGE_TIMEOUT", "60")),
+    "activities": float(os.getenv("ACTIVITY_STAGE_TIMEOUT", "120"))
+}
+
+def no_progress(event, **data):
+    pass
+
 def process_date(date):
     return date[:10]
 
@@ -83,15 +99,29 @@ def condense_data(data, origin, destination, depart):
 
     return result
 
-def process_flight_data(user_input):
-    depart_from = user_input['from']
-    depart_to = user_input['to']
+def timed(fn, *args):
+    """Run fn(*args) and return (result, elapsed seconds)."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def preference_text(user_input):
+    return user_input['from'] + " " + user_input['additionalInfo']
 
-    # convert the from and to values into airports
-    goal_agent = hotel_agent.GoalAgent()
+def extract_trip(user_input):
+    """Airports for both ends and the traveller's preferences, from one LLM call."""
+    agent = goal_agent.GoalAgent()
+    return agent.extract_trip(user_input['from'], user_input['to'], preference_text(user_input))
 
-    depart_from = goal_agent.extract(depart_from)
-    depart_to = goal_agent.extract(depart_to)
+def process_flight_data(user_input, concurrent=False, trip=None, progress=no_progress):
+    if trip is not None:
+        depart_from = trip['origin_airports']
+        depart_to = trip['destination_airports']
+    else:
+        # convert the from and to values into airports
+        airport_agent = hotel_agent.GoalAgent()
+        depart_from = airport_agent.extract(user_input['from'])
+        depart_to = airport_agent.extract(user_input['to'])
 
 
     from_airport = random.choice(list(depart_from.keys()))
@@ -102,15 +132,29 @@ def process_flight_data(user_input):
 
     access_token = flights.get_access_token(os.getenv("AMADEUS_API_KEY"), os.getenv("AMADEUS_API_SECRET"))
 
-    flight_data = flights.get_flight_json_data(from_airport, to_airport, start_date, access_token)
+    if concurrent:
+        # Outbound and return searches are independent, so issue them together
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            depart_future = pool.submit(flights.get_flight_json_data, from_airport, to_airport, start_date, access_token)
+            return_future = pool.submit(flights.get_flight_json_data, to_airport, from_airport, end_date, access_token)
+            flight_data = depart_future.result()
+            return_flight = return_future.result()
+    else:
+        flight_data = flights.get_flight_json_data(from_airport, to_airport, start_date, access_token)
+        return_flight = flights.get_flight_json_data(to_airport, from_airport, end_date, access_token)
+
     depart = condense_data(flight_data, from_airport, to_airport, start_date)
-    return_flight = flights.get_flight_json_data(to_airport, from_airport, end_date, access_token)
     return_flight = condense_data(return_flight, to_airport, from_airport, end_date)
+    progress("flights_found", origin=from_airport, destination=to_airport,
+             outbound=len(depart['Offers']), inbound=len(return_flight['Offers']))
 
     return depart, return_flight
 
-def process_hotel_data(user_input):
-    return hotels.use_agent_to_calc_dist(user_input['to'])
+def process_hotel_data(user_input, trip=None, progress=no_progress):
+    airports = trip['destination_airports'] if trip is not None else None
+    hotel_data = hotels.use_agent_to_calc_dist(user_input['to'], airports=airports)
+    progress("hotels_found", count=len(hotel_data))
+    return hotel_data
 
 def format(data):
     return data
@@ -136,7 +180,9 @@ def format(data):
         hotel_data = ""
         hotel_data += f"\nName: {chosen_hotel['name']}"
         hotel_data += f"\nPrice per night: ${chosen_hotel['price']}"
-        hotel_data += f"\nDistance from airport: {chosen_hotel['Distance from Airport']:.2f} km"
+        distance = chosen_hotel['Distance from Airport']
+        # None for hotels Amadeus lists without a geoCode
+        hotel_data += f"\nDistance from airport: {distance:.2f} km" if distance is not None else "\nDistance from airport: unknown"
         
         output['Hotels'] = hotel_data
         return output
@@ -157,12 +203,7 @@ def format(data):
 
         
 
-def make_itinerary(user_input):
-    complete_data = {}
-    departing_flight, return_flight = process_flight_data(user_input)
-
-    hotel_data = process_hotel_data(user_input)
-
+def process_activity_data(user_input, trip=None, progress=no_progress):
     planner = trip_planner_agent.TripPlannerAgent()
 
     start_date = datetime.fromisoformat(user_input['start_date'][:-1] + '+00:00')
@@ -171,19 +212,110 @@ def make_itinerary(user_input):
     # Calculate duration in days
     duration = (end_date - start_date).days
     trip = planner.plan_trip(
-        user_input=user_input['from'] + " " + user_input['additionalInfo'],
+        user_input=preference_text(user_input),
         destination=user_input['to'],
         start_date=start_date.strftime("%Y-%m-%d"),
-        duration=duration
+        duration=duration,
+        preferences=trip['preferences'] if trip is not None else None,
+        progress=progress
     )
 
     trip = planner.format_itinerary(trip)
 
     activities = json.dumps(trip, cls=trip_planner_agent.DateTimeEncoder)
+    return json.loads(activities)
+
+def run_stages_serial(user_input, trip=None, progress=no_progress):
+    """Run the flight, hotel and activity stages one after another."""
+    stages = {
+        "flights": lambda: process_flight_data(user_input, trip=trip, progress=progress),
+        "hotels": lambda: process_hotel_data(user_input, trip=trip, progress=progress),
+        "activities": lambda: process_activity_data(user_input, trip=trip, progress=progress)
+    }
+    results = {}
+    timings = {}
+    for name, stage in stages.items():
+        results[name], timings[name] = timed(stage)
+    return results, timings
+
+def run_stages_concurrent(user_input, stage_timeouts=None, trip=None, progress=no_progress):
+    """
+    Run the flight, hotel and activity stages in parallel.
+
+    Each stage is bounded by its entry in stage_timeouts (seconds, measured from
+    submission). The first stage to fail or time out aborts the whole run and its
+    error is re-raised as soon as it happens, whatever order the stages are in;
+    stages still in flight are abandoned.
+    """
+    stage_timeouts = stage_timeouts or STAGE_TIMEOUTS
+    stages = {
+        "flights": lambda: process_flight_data(user_input, concurrent=True, trip=trip, progress=progress),
+        "hotels": lambda: process_hotel_data(user_input, trip=trip, progress=progress),
+        "activities": lambda: process_activity_data(user_input, trip=trip, progress=progress)
+    }
+    results = {}
+    timings = {}
+    pool = ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="itinerary-stage")
+    try:
+        submitted_at = time.perf_counter()
+        names = {pool.submit(timed, stage): name for name, stage in stages.items()}
+        deadlines = {future: submitted_at + stage_timeouts.get(name, 60) for future, name in names.items()}
+        pending = set(names)
+        while pending:
+            # Wake at the first failure or the earliest deadline, whichever comes first
+            next_deadline = min(deadlines[future] for future in pending)
+            done, pending = wait(pending, timeout=max(next_deadline - time.perf_counter(), 0),
+                                 return_when=FIRST_EXCEPTION)
+            for future in done:
+                name = names[future]
+                try:
+                    results[name], timings[name] = future.result()
+                except Exception as e:
+                    logger.error(f"{name} stage failed: {str(e)}")
+                    raise
+            now = time.perf_counter()
+            for future in sorted(pending, key=deadlines.get):
+                if now >= deadlines[future]:
+                    name = names[future]
+                    raise TimeoutError(f"{name} stage timed out after {stage_timeouts.get(name, 60):.0f}s")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, timings
+
+def make_itinerary(user_input, concurrent=True, stage_timeouts=None, progress=None):
+    """
+    Plan flights, hotels and activities for a trip submission.
+
+    progress, if given, is called as progress(event, **details) as each step
+    finishes; stages run on their own threads, so it must be thread-safe.
+    """
+    complete_data = {}
+    progress = progress or no_progress
+
+    started = time.perf_counter()
+    # Every stage needs the parsed request, so it is extracted once up front
+    trip, extract_time = timed(extract_trip, user_input)
+    progress("preferences_extracted", origin_airports=list(trip['origin_airports']),
+             destination_airports=list(trip['destination_airports']))
+    if concurrent:
+        results, timings = run_stages_concurrent(user_input, stage_timeouts, trip=trip, progress=progress)
+    else:
+        results, timings = run_stages_serial(user_input, trip=trip, progress=progress)
+    timings = {"extract": extract_time, **timings}
+    wall_time = time.perf_counter() - started
+
+    # The serial path costs roughly the sum of the stages; report what running them together saved
+    saved = max(sum(timings.values()) - wall_time, 0)
+    logger.info(
+        "Itinerary stages " + ", ".join(f"{name}={elapsed:.2f}s" for name, elapsed in timings.items())
+        + f"; wall time {wall_time:.2f}s, saved {saved:.2f}s vs serial"
+    )
+
+    departing_flight, return_flight = results['flights']
 
     complete_data['flight_depart'] = departing_flight
     complete_data['return_flight'] = return_flight
-    complete_data['hotel_data'] = hotel_data
-    complete_data['Activities'] = json.loads(activities)
+    complete_data['hotel_data'] = results['hotels']
+    complete_data['Activities'] = results['activities']
     print(complete_data)
     return format(complete_data)
@@ -1,6 +1,12 @@
-from typing import Dict, List, Optional, Any, Tuple, Union
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Any, Set, Tuple, Union
+from collections import Counter
 from dataclasses import dataclass
-from app.utils.api_wrappers import fetch_places
+from operator import itemgetter
+from array import array
+import heapq
+import math
+import sys
+from app.utils.api_wrappers import iter_places
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,56 +38,364 @@ class POI:
     distance_from_hotel: Optional[float] = None
     gap_until_next: Optional[int] = None
 
+
+def _optional(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _from_optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class POITable:
+    """
+    Columnar storage for POIs, addressed by row index.
+
+    Coordinates, scores, ratings and prices live in typed arrays (NaN for a
+    missing rating or price), repeated strings like types are interned, and
+    each distinct tag is stored once and referenced by id, so a row costs a
+    few machine words plus its name instead of a 25-field POI with its own
+    list of tag tuples. Rows are appended, never changed.
+    """
+
+    def __init__(self, pois: Iterable[POI] = ()):
+        self.names: List[str] = []
+        self.descriptions: List[str] = []
+        self.types: List[str] = []
+        self.matched_themes: List[str] = []
+        self.osm_types: List[str] = []
+        self.osm_ids = array('q')
+        self.lats = array('d')
+        self.lons = array('d')
+        self.relevance_scores = array('d')
+        self.theme_scores = array('d')
+        self.tag_scores = array('d')
+        self.ratings = array('d')
+        self.prices = array('d')
+        # Row i's tag ids are tag_ids[tag_offsets[i]:tag_offsets[i + 1]]
+        self.tag_offsets = array('L', [0])
+        self.tag_ids = array('L')
+        self.tag_vocab: List[Tuple[str, str]] = []
+        self._tag_index: Dict[Tuple[str, str], int] = {}
+        self.extend(pois)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, poi: POI) -> int:
+        """Add poi and return its row."""
+        self.names.append(poi.name)
+        self.descriptions.append(sys.intern(poi.description or ""))
+        self.types.append(sys.intern(poi.type))
+        self.matched_themes.append(sys.intern(poi.matched_theme))
+        self.osm_types.append(sys.intern(poi.osm_type or ""))
+        self.osm_ids.append(poi.osm_id or 0)
+        self.lats.append(poi.location[0])
+        self.lons.append(poi.location[1])
+        self.relevance_scores.append(poi.relevance_score)
+        self.theme_scores.append(poi.theme_score)
+        self.tag_scores.append(poi.tag_score)
+        self.ratings.append(_optional(poi.rating))
+        self.prices.append(_optional(poi.price))
+        for tag in poi.tags:
+            self.tag_ids.append(self._intern_tag(tag[0], tag[1]))
+        self.tag_offsets.append(len(self.tag_ids))
+        return len(self.names) - 1
+
+    def extend(self, pois: Iterable[POI]) -> range:
+        """Add pois and return the rows they got."""
+        start = len(self)
+        for poi in pois:
+            self.append(poi)
+        return range(start, len(self))
+
+    def _intern_tag(self, key: str, value: str) -> int:
+        tag = (key, value)
+        tag_id = self._tag_index.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_index[tag] = len(self.tag_vocab)
+            self.tag_vocab.append((sys.intern(key), sys.intern(value)))
+        return tag_id
+
+    def tag_id(self, key: str, value: str) -> Optional[int]:
+        return self._tag_index.get((key, value))
+
+    def row_tag_ids(self, row: int) -> array:
+        return self.tag_ids[self.tag_offsets[row]:self.tag_offsets[row + 1]]
+
+    def tags(self, row: int) -> List[Tuple[str, str]]:
+        return [self.tag_vocab[tag_id] for tag_id in self.row_tag_ids(row)]
+
+    def location(self, row: int) -> Tuple[float, float]:
+        return self.lats[row], self.lons[row]
+
+    def rating(self, row: int) -> Optional[float]:
+        return _from_optional(self.ratings[row])
+
+    def price(self, row: int) -> Optional[float]:
+        return _from_optional(self.prices[row])
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Row as a standalone dict with the POI fields itineraries show."""
+        return {
+            "name": self.names[row],
+            "description": self.descriptions[row],
+            "location": self.location(row),
+            "type": self.types[row],
+            "tags": self.tags(row),
+            "price": self.price(row),
+            "osm_id": self.osm_ids[row],
+            "osm_type": self.osm_types[row],
+            "relevance_score": self.relevance_scores[row],
+            "theme_score": self.theme_scores[row],
+            "tag_score": self.tag_scores[row],
+            "matched_theme": self.matched_themes[row],
+            "rating": self.rating(row)
+        }
+
+    def poi(self, row: int) -> POI:
+        return POI(
+            name=self.names[row],
+            description=self.descriptions[row],
+            location=self.location(row),
+            type=self.types[row],
+            tags=self.tags(row),
+            osm_id=self.osm_ids[row],
+            osm_type=self.osm_types[row],
+            relevance_score=self.relevance_scores[row],
+            theme_score=self.theme_scores[row],
+            tag_score=self.tag_scores[row],
+            matched_theme=self.matched_themes[row],
+            price=self.price(row),
+            rating=self.rating(row)
+        )
+
+
+# Theme of each "key=value" tag
+TAG_THEMES = {
+    # Entertainment
+    "amenity=theatre": "entertainment",
+    "amenity=cinema": "entertainment",
+    "amenity=nightclub": "entertainment",
+    "leisure=amusement_park": "entertainment",
+
+    # Architecture
+    "building=cathedral": "architecture",
+    "building=church": "architecture",
+    "building=mosque": "architecture",
+    "building=temple": "architecture",
+    "building=historical": "architecture",
+    "historic=monument": "architecture",
+
+    # Culture
+    "amenity=museum": "culture",
+    "amenity=library": "culture",
+    "amenity=art_gallery": "culture",
+
+    # Shopping
+    "shop=mall": "shopping",
+    "shop=retail": "shopping",
+
+    # Food
+    "amenity=restaurant": "food",
+    "amenity=cafe": "food",
+    "amenity=bar": "food",
+
+    # Nature
+    "leisure=park": "nature",
+    "natural=wood": "nature",
+    "natural=water": "nature",
+
+    # Sports
+    "leisure=sports_centre": "sports",
+    "amenity=sports_centre": "sports",
+    "leisure=stadium": "sports",
+
+    # Adventure
+    "tourism=attraction": "adventure",
+    "leisure=park": "adventure",
+    "natural=peak": "adventure"
+}
+
+# Themes a tag implies beyond TAG_THEMES
+EXTRA_TAG_THEMES = {
+    ("amenity", "restaurant"): ("food",),
+    ("amenity", "cafe"): ("food",),
+    ("amenity", "bar"): ("food",),
+    ("building", "church"): ("architecture",),
+    ("building", "mosque"): ("architecture",),
+    ("building", "temple"): ("architecture",),
+    ("shop", "mall"): ("shopping",),
+    ("shop", "retail"): ("shopping",),
+    ("leisure", "park"): ("nature", "sports"),
+    ("leisure", "sports_centre"): ("nature", "sports"),
+    ("leisure", "stadium"): ("nature", "sports"),
+    ("natural", "wood"): ("nature",),
+    ("natural", "water"): ("nature",),
+    ("tourism", "attraction"): ("adventure",)
+}
+
+
+class TagMatcher:
+    """
+    A POIAgent's tags and the theme table, compiled once for scoring.
+
+    Every tag either of them mentions gets an integer id, found through a
+    key -> value -> id table, and per-id lists hold what scoring needs: the
+    relevance weight against the user's tags, whether it is one of them, its
+    TAG_THEMES theme and every theme it implies. A POI is then scored in one
+    pass over its own tags with two dict lookups per tag, instead of comparing
+    freshly built "key=value" strings against every user tag.
+    """
+
+    def __init__(self, osm_tags: List[List[str]], tag_themes: Dict[str, str]):
+        self._ids: Dict[str, Dict[str, int]] = {}
+        self.weights: List[float] = []
+        self.exact: List[bool] = []
+        self.table_theme: List[Optional[str]] = []
+        self.implied: List[FrozenSet[str]] = []
+
+        key_counts = Counter(tag[0] for tag in osm_tags)
+        exact_counts = Counter((tag[0], tag[1]) for tag in osm_tags)
+        # A tag whose key matches n user tags scores 0.5 each, plus another
+        # 0.5 for each user tag it equals exactly
+        self.key_weight = {key: 0.5 * count for key, count in key_counts.items()}
+
+        for (key, value), count in exact_counts.items():
+            tag_id = self._intern(key, value)
+            self.weights[tag_id] += 0.5 * count
+            self.exact[tag_id] = True
+        for key_value, theme in tag_themes.items():
+            key, value = key_value.split("=", 1)
+            tag_id = self._intern(key, value)
+            self.table_theme[tag_id] = theme
+            self.implied[tag_id] |= {theme}
+        for (key, value), themes in EXTRA_TAG_THEMES.items():
+            tag_id = self._intern(key, value)
+            self.implied[tag_id] |= set(themes)
+
+    def _intern(self, key: str, value: str) -> int:
+        values = self._ids.setdefault(key, {})
+        tag_id = values.get(value)
+        if tag_id is None:
+            tag_id = values[value] = len(self.weights)
+            self.weights.append(self.key_weight.get(key, 0.0))
+            self.exact.append(False)
+            self.table_theme.append(None)
+            self.implied.append(frozenset())
+        return tag_id
+
+    def tag_id(self, key: str, value: str) -> Optional[int]:
+        values = self._ids.get(key)
+        return values.get(value) if values else None
+
+    def relevance(self, tags: Iterable[Tuple[str, str]]) -> float:
+        """Sum over tags of 1.0 per equal user tag and 0.5 per user tag sharing only the key."""
+        ids, weights, key_weight = self._ids, self.weights, self.key_weight
+        score = 0.0
+        for key, value in tags:
+            values = ids.get(key)
+            tag_id = values.get(value) if values else None
+            score += weights[tag_id] if tag_id is not None else key_weight.get(key, 0.0)
+        return score
+
+    def match(self, tags: Iterable[Tuple[str, str]], description: str, themes: Set[str]) -> Tuple[float, str]:
+        """
+        Description-aware match score (capped at 1.0) and the POI's theme.
+
+        Each tag adds 0.5 if it is one of the user's tags, 0.3 if its value
+        appears in description and 0.2 if its TAG_THEMES theme is in themes.
+        The theme is the alphabetically first one any tag implies.
+        """
+        score = 0.0
+        found: Set[str] = set()
+        for key, value in tags:
+            if value.lower() in description:
+                score += 0.3
+            tag_id = self.tag_id(key, value)
+            if tag_id is None:
+                continue
+            if self.exact[tag_id]:
+                score += 0.5
+            if self.table_theme[tag_id] in themes:
+                score += 0.2
+            found |= self.implied[tag_id]
+        return min(1.0, score), min(found) if found else "unknown"
+
+
+def _rating_and_price(tags: Iterable[Tuple[str, str]]) -> Tuple[Optional[float], Optional[float]]:
+    rating = None
+    price = None
+    for k, v in tags:
+        if k == 'rating':
+            try:
+                rating = float(v)
+            except ValueError:
+                pass
+        elif k == 'price':
+            try:
+                price = float(v)
+            except ValueError:
+                pass
+    return rating, price
+
+
+class _TopK:
+    """The max_results highest-scoring items pushed, kept in a bounded heap; ties keep push order."""
+
+    def __init__(self, max_results: int):
+        self.max_results = max_results
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._pushed = 0
+
+    def push(self, score: float, item: Any) -> None:
+        # -pushed ranks earlier items above later ones with the same score
+        entry = (score, -self._pushed, item)
+        self._pushed += 1
+        if len(self._heap) < self.max_results:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Any]:
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+def top_pois_by_tags(raw_pois: Iterable[Dict[str, Any]], tags: List[List[str]], matching_agent: "POIAgent",
+                     rest_agent: "POIAgent", max_results: int) -> Tuple[List[POI], List[POI], Tuple[int, int]]:
+    """
+    Best POIs for two agents from one pass over one combined set of places.
+
+    Places carrying any of tags go to matching_agent and the rest to
+    rest_agent, e.g. food tags pick out the restaurants and everything else
+    is an activity candidate. Each agent keeps only its best max_results, so
+    memory stays proportional to max_results however many places stream by.
+    Returns both agents' POIs, as get_pois would, and how many places each
+    was offered.
+    """
+    wanted = {tuple(tag) for tag in tags}
+    matching, rest = _TopK(max_results), _TopK(max_results)
+    offered = [0, 0]
+    for raw_poi in raw_pois:
+        if any(tuple(tag) in wanted for tag in raw_poi.get('tags', [])):
+            agent, top, side = matching_agent, matching, 0
+        else:
+            agent, top, side = rest_agent, rest, 1
+        offered[side] += 1
+        for candidate in agent._candidates((raw_poi,)):
+            top.push(candidate[0], candidate)
+    return ([matching_agent._to_poi(*candidate) for candidate in matching.items()],
+            [rest_agent._to_poi(*candidate) for candidate in rest.items()],
+            (offered[0], offered[1]))
+
 class POIAgent:
     def __init__(self, location: str, osm_tags: List[List[str]], budget: Optional[Dict[str, float]] = None):
         self.location = location
         self.osm_tags = osm_tags
         self.budget = budget
         self.themes = set()
-        self.tag_to_theme = {
-            # Entertainment
-            "amenity=theatre": "entertainment",
-            "amenity=cinema": "entertainment",
-            "amenity=nightclub": "entertainment",
-            "leisure=amusement_park": "entertainment",
-            
-            # Architecture
-            "building=cathedral": "architecture",
-            "building=church": "architecture",
-            "building=mosque": "architecture",
-            "building=temple": "architecture",
-            "building=historical": "architecture",
-            "historic=monument": "architecture",
-            
-            # Culture
-            "amenity=museum": "culture",
-            "amenity=library": "culture",
-            "amenity=art_gallery": "culture",
-            
-            # Shopping
-            "shop=mall": "shopping",
-            "shop=retail": "shopping",
-            
-            # Food
-            "amenity=restaurant": "food",
-            "amenity=cafe": "food",
-            "amenity=bar": "food",
-            
-            # Nature
-            "leisure=park": "nature",
-            "natural=wood": "nature",
-            "natural=water": "nature",
-            
-            # Sports
-            "leisure=sports_centre": "sports",
-            "amenity=sports_centre": "sports",
-            "leisure=stadium": "sports",
-            
-            # Adventure
-            "tourism=attraction": "adventure",
-            "leisure=park": "adventure",
-            "natural=peak": "adventure"
-        }
+        self.tag_to_theme = TAG_THEMES
+        self.matcher = TagMatcher(osm_tags, TAG_THEMES)
 
     def _normalize_theme_weights(self, themes: Union[List[str], Dict[str, float]]) -> Dict[str, float]:
         if isinstance(themes, list):
@@ -92,59 +406,10 @@ class POIAgent:
 
     def _get_theme_from_tags(self, tags: List[Tuple[str, str]]) -> str:
         """Get the most relevant theme from a list of tags."""
-        themes = set()
-        for tag in tags:
-            key_value = f"{tag[0]}={tag[1]}"
-            if key_value in self.tag_to_theme:
-                themes.add(self.tag_to_theme[key_value])
-            
-            # Handle special cases
-            if tag[0] == "amenity" and tag[1] in ["restaurant", "cafe", "bar"]:
-                themes.add("food")
-            elif tag[0] == "building" and tag[1] in ["church", "mosque", "temple"]:
-                themes.add("architecture")
-            elif tag[0] == "shop" and tag[1] in ["mall", "retail"]:
-                themes.add("shopping")
-            elif tag[0] == "leisure" and tag[1] in ["park", "sports_centre", "stadium"]:
-                themes.add("nature")
-                themes.add("sports")
-            elif tag[0] == "natural" and tag[1] in ["wood", "water"]:
-                themes.add("nature")
-            elif tag[0] == "tourism" and tag[1] == "attraction":
-                themes.add("adventure")
-        
-        return sorted(themes)[0] if themes else "unknown"
+        return self.matcher.match(tags, "", set())[1]
 
     def _score_poi(self, poi: Dict[str, Any]) -> Tuple[float, str]:
-        description = poi.get('description', '').lower()
-        tags = poi.get('tags', [])
-        
-        # Calculate base score based on tags
-        base_score = 0.0
-        
-        # Check for exact tag matches
-        for tag_key, tag_value in tags:
-            key_value = f"{tag_key}={tag_value}"
-            if any(f"{t[0]}={t[1]}" == key_value for t in self.osm_tags):
-                base_score += 0.5
-            
-            # Check for partial matches in description
-            if tag_value.lower() in description:
-                base_score += 0.3
-            
-            # Check for theme matches
-            if key_value in self.tag_to_theme:
-                theme = self.tag_to_theme[key_value]
-                if theme in self.themes:
-                    base_score += 0.2
-        
-        # Normalize score
-        base_score = min(1.0, base_score)
-        
-        # Get theme from tags
-        theme = self._get_theme_from_tags(tags)
-        
-        return base_score, theme
+        return self.matcher.match(poi.get('tags', []), poi.get('description', '').lower(), self.themes)
 
     def _filter_by_budget(self, poi: Dict[str, Any]) -> bool:
         if not self.budget:
@@ -157,84 +422,64 @@ class POIAgent:
                     continue
         return True
 
-    def get_pois(self, max_results: int = 10) -> List[POI]:
+    def _candidates(self, raw_pois: Iterable[Dict[str, Any]]) -> Iterator[Tuple[float, Dict[str, Any], Optional[float], Optional[float]]]:
+        """(score, place, rating, price) for each place within budget, one at a time."""
+        max_price = self.budget.get('max') if self.budget else None
+        for raw_poi in raw_pois:
+            tags = raw_poi.get('tags', [])
+            rating, price = _rating_and_price(tags)
+            # Filter by budget if specified
+            if max_price is not None and price and price > max_price:
+                continue
+            yield self.matcher.relevance(tags), raw_poi, rating, price
+
+    def _to_poi(self, score: float, raw_poi: Dict[str, Any], rating: Optional[float], price: Optional[float]) -> POI:
+        tags = [(k, v) for k, v in raw_poi.get('tags', [])]
+        # Places carry "location"/"osm_id"/"osm_type"; bare Overpass records "lat"/"lon"/"id"/"type"
+        location = raw_poi.get('location') or (raw_poi.get('lat', 0.0), raw_poi.get('lon', 0.0))
+        return POI(
+            name=raw_poi.get('name', 'Unknown'),
+            description=raw_poi.get('description', ''),
+            location=(location[0], location[1]),
+            type=tags[0][0] if tags else 'unknown',  # Use first tag's key as type
+            tags=tags,
+            osm_id=raw_poi.get('osm_id', raw_poi.get('id', 0)),
+            osm_type=raw_poi.get('osm_type', raw_poi.get('type', '')),
+            relevance_score=score,
+            theme_score=score,
+            tag_score=score,
+            matched_theme=tags[0][0] if tags else '',  # Use first tag's key as theme
+            rating=rating,
+            price=price
+        )
+
+    def get_pois(self, max_results: int = 10, raw_pois: Optional[Iterable[Dict[str, Any]]] = None) -> List[POI]:
         """
         Get POIs based on user preferences.
-        
+
+        Places stream through budget filtering and scoring one at a time, and
+        only the best max_results are kept (in a heap) and turned into POI
+        objects, so get_pois adds memory proportional to max_results however
+        many places there are. The places themselves are only streamed as far
+        as their source allows: cached map tiles are read one at a time, but a
+        fresh Overpass response is held whole while it is cached.
+
         Args:
             max_results: Maximum number of POIs to return
-            
+            raw_pois: Places already fetched for this location, as any iterable; fetched by tag if omitted
+
         Returns:
-            List of POI objects
+            List of POI objects, most relevant first (ties keep fetch order)
         """
         try:
             # Fetch raw POIs from API
-            raw_pois = fetch_places(self.location, kinds=self.osm_tags)
-            
-            if not raw_pois:
-                return []
-            
-            # Convert raw POIs to our POI objects
-            pois = []
-            for raw_poi in raw_pois:
-                # Get tags from raw POI
-                tags = [(k, v) for k, v in raw_poi.get('tags', [])]
-                
-                # Calculate score based on tag matches
-                score = 0.0
-                for user_tag in self.osm_tags:
-                    user_key_value = f"{user_tag[0]}={user_tag[1]}"
-                    for poi_tag in tags:
-                        poi_key_value = f"{poi_tag[0]}={poi_tag[1]}"
-                        if user_key_value == poi_key_value:
-                            score += 1.0
-                        elif user_tag[0] == poi_tag[0]:  # Partial match on key
-                            score += 0.5
-                
-                # Get rating and price information
-                rating = None
-                price = None
-                for k, v in raw_poi.get('tags', []):
-                    if k == 'rating':
-                        try:
-                            rating = float(v)
-                        except ValueError:
-                            pass
-                    elif k == 'price':
-                        try:
-                            price = float(v)
-                        except ValueError:
-                            pass
-                
-                # Create POI object
-                poi = POI(
-                    name=raw_poi.get('name', 'Unknown'),
-                    description=raw_poi.get('description', ''),
-                    location=(raw_poi.get('lat', 0.0), raw_poi.get('lon', 0.0)),
-                    type=tags[0][0] if tags else 'unknown',  # Use first tag's key as type
-                    tags=tags,
-                    osm_id=raw_poi.get('id', 0),
-                    osm_type=raw_poi.get('type', ''),
-                    relevance_score=score,
-                    theme_score=score,
-                    tag_score=score,
-                    matched_theme=tags[0][0] if tags else '',  # Use first tag's key as theme
-                    rating=rating,
-                    price=price
-                )
-                
-                # Filter by budget if specified
-                if self.budget and price and price > self.budget['max']:
-                    continue
-                
-                pois.append(poi)
-            
-            # Sort by relevance score (higher is better)
-            pois = sorted(pois, key=lambda p: p.relevance_score, reverse=True)
-            # If we have fewer than max_results, return all
-            return pois[:max_results]
-            
+            if raw_pois is None:
+                raw_pois = iter_places(self.location, tags=self.osm_tags)
+
+            # Equivalent to a stable sort by score, descending, then [:max_results]
+            best = heapq.nlargest(max_results, self._candidates(raw_pois), key=itemgetter(0))
+            return [self._to_poi(*candidate) for candidate in best]
+
         except Exception as e:
             logger.error(f"Error fetching POIs: {str(e)}")
             return []
-
@@ -1,14 +1,13 @@
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from datetime import datetime
 from .goal_agent import GoalAgent
-from .poi_agent import POIAgent
-from .itinerary_agent import ItineraryAgent
+from .poi_agent import POIAgent, top_pois_by_tags
+from .itinerary_agent import ItineraryAgent, expand_visit
 import logging
-from app.utils.api_wrappers import get_location_coordinates 
+from app.utils.api_wrappers import get_location_coordinates, iter_osm_places
 import json
-from flask import Flask, request, jsonify
 
-app = Flask(__name__, instance_relative_config=True)
+logger = logging.getLogger(__name__)
 
 
 class DateTimeEncoder(json.JSONEncoder):
@@ -41,8 +40,12 @@ class TripPlannerAgent:
         "currency": "EUR"
         }
 
-    def plan_trip(self, user_input: str, destination: str, start_date: str, duration: int) -> Dict[str, Any]:
-        preferences = self.goal_agent.extract(user_input)
+    def plan_trip(self, user_input: str, destination: str, start_date: str, duration: int,
+                  preferences: Optional[Dict[str, Any]] = None,
+                  progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        progress = progress or (lambda event, **data: None)
+        if preferences is None:
+            preferences = self.goal_agent.extract(user_input)
         print(preferences)
         food_tags = [["amenity", "restaurant"], ["amenity", "cafe"], ["amenity", "bar"]]
         food_keys = {"restaurant", "cafe", "bar", "food", "fast_food", "pub", "bistro", "diner"}
@@ -75,9 +78,26 @@ class TripPlannerAgent:
         self.poi_agent_activities = POIAgent(location=destination, osm_tags=activity_tags, budget=preferences.get("budget"))
         self.poi_agent_food = POIAgent(location=destination, osm_tags=food_tags, budget=preferences.get("budget"))
 
-        activities_pois = self.poi_agent_activities.get_pois(max_results=20)
-        food_pois = self.poi_agent_food.get_pois(max_results=20)
+        # One geocode and one Overpass query for both agents, split locally by tag
+        coords = None
+        try:
+            coords = get_location_coordinates(destination)
+            if not coords:
+                raise ValueError(f"Could not find coordinates for location: {destination}")
+            progress("geocoded", lat=coords["lat"], lon=coords["lon"])
+            raw_pois = iter_osm_places(lat=coords["lat"], lon=coords["lon"], tags=activity_tags + food_tags)
+        except ValueError as e:
+            logger.error(f"Error fetching POIs: {str(e)}")
+            raw_pois = []
+        # One streaming pass; each agent keeps only its top 20
+        food_pois, activities_pois, (food_count, activity_count) = top_pois_by_tags(
+            raw_pois, food_tags, self.poi_agent_food, self.poi_agent_activities, max_results=20
+        )
+        progress("pois_fetched", activities=activity_count, food=food_count)
         hotel_info = self.mock_hotel
+        if coords:
+            # The mock hotel is fixed in Paris; start each day from the destination itself
+            hotel_info = dict(hotel_info, location=(coords["lat"], coords["lon"]))
         start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
 
         # import pdb; pdb.set_trace()
@@ -89,6 +109,7 @@ class TripPlannerAgent:
             hotel_info=hotel_info,
             user_tags=preferences['osm_tags']
         )
+        progress("itinerary_scheduled", days=duration)
         return {
             "destination": destination,
             "start_date": start_date,
@@ -113,11 +134,13 @@ class TripPlannerAgent:
         summary.append(f"Total Activities: {trip_plan['itinerary']['total_activities']}")
         summary.append(f"Total Meals: {trip_plan['itinerary']['total_meals']}")
 
+        pois = trip_plan['itinerary']['pois']
         for day in trip_plan['itinerary']['itinerary']:
             summary.append(f"\nDay {day['day']}: {day['date'].strftime('%A, %B %d')}")
             summary.append("\nActivities:")
             if day['activities']:
                 for activity in day['activities']:
+                    activity = expand_visit(pois, activity)
                     summary.append(f"- {activity['name']} ({activity['type']})")
                     summary.append(f"  Time: {activity['start_time']} to {activity['end_time']}")
                     summary.append(f"  Duration: {activity['duration']} minutes")
@@ -127,6 +150,7 @@ class TripPlannerAgent:
             summary.append("\nMeals:")
             if day['meals']:
                 for meal in day['meals']:
+                    meal = expand_visit(pois, meal)
                     summary.append(f"- {meal['name']} ({meal['type']})")
                     summary.append(f"  Time: {meal['start_time']} to {meal['end_time']}")
                     summary.append(f"  Duration: {meal['duration']} minutes")
@@ -145,6 +169,7 @@ class TripPlannerAgent:
             return website_tags[0] if website_tags else None
         
         # Iterate through each day's activities and meals
+        pois = trip_data['itinerary']['pois']
         for day in trip_data['itinerary']['itinerary']:
             day_number = f"day_{day['day']}"
             formatted_itinerary[day_number] = {
@@ -154,6 +179,7 @@ class TripPlannerAgent:
             
             # Format activities
             for activity in day['activities']:
+                activity = expand_visit(pois, activity)
                 website = get_website(activity.get('tags', []))
             
                 
@@ -171,6 +197,7 @@ class TripPlannerAgent:
             
             # Format meals
             for meal in day['meals']:
+                meal = expand_visit(pois, meal)
                 website = get_website(meal.get('tags', []))
                 
                 formatted_meal = {
@@ -187,7 +214,6 @@ class TripPlannerAgent:
         
         return formatted_itinerary
 
-#@app.route('/plan_trip', methods=['POST'])
 def main():
     planner = TripPlannerAgent()
     
@@ -3,12 +3,20 @@ import os
 import json
 import logging
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from .agents.trip_planner_agent import TripPlannerAgent
 from .agents.make_itinerary import make_itinerary
-from .agents.chatbot import edit_itinerary
+from .agents.chatbot import edit_itinerary, edit_itinerary_patch, stream_itinerary_patch
+from .utils.itinerary_patch import apply_patch
+from .utils.jobs import JobManager, QueueFullError, DONE, FAILED
+from .utils.trip_store import TripStore
+from .utils.storage import data_path
+from .utils import http_client
+from .utils.llm_cache import llm_cache
+from .utils.geocode_cache import geocode_cache
+from .utils.airports import coordinate_cache
 import random
+import uuid
 
 
 # Set up logging
@@ -24,20 +32,55 @@ CORS(app, resources={
     r"/*": {
         "origins": ["http://localhost:3000", "http://127.0.0.1:3000"],
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", "Last-Event-ID"]
     }
 })
 
-trip_planner = TripPlannerAgent()
+# Trip results keyed by trip id, shared by every worker on this host
+trip_store = TripStore(
+    path=os.getenv("TRIP_STORE_PATH", data_path("trips.sqlite3")),
+    max_entries=int(os.getenv("TRIP_STORE_MAX_ENTRIES", "1000")),
+    ttl=float(os.getenv("TRIP_STORE_TTL_SECONDS", str(7 * 24 * 3600)))
+)
 
-# Simple in-memory store (replace with Redis/db later)
-trip_data_store = {}
+# Trip planning takes tens of seconds, so it runs on a bounded pool off the request thread
+job_manager = JobManager(
+    max_workers=int(os.getenv("TRIP_JOB_WORKERS", "4")),
+    max_queue=int(os.getenv("TRIP_JOB_QUEUE_DEPTH", "32"))
+)
+
+
+def run_trip_job(trip_id, data):
+    # The job id is the trip id, so stage progress lands on this job's event log
+    itinerary_data = make_itinerary(data, progress=lambda event, **details: job_manager.publish(trip_id, event, **details))
+    trip_store.put(trip_id, itinerary_data)
+    return trip_id
+
+
+def resolve_trip_id():
+    # No fallback to some other trip: without an id the request can't be served
+    return request.args.get("trip_id", "").strip() or None
+
+
+def sse_event(event, data, event_id=None):
+    """One server-sent event frame."""
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+
+def event_stream(frames):
+    # Tell nginx and friends not to buffer, or nothing reaches the browser until the end
+    return Response(frames, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.route('/')
 def index():
     return jsonify({
         "status": "TravelBuddy API is running",
-        "endpoints": ["/submit_trip_data (POST)", "/generate_itinerary (GET)"]
+        "endpoints": ["/submit_trip_data (POST)", "/jobs/<job_id> (GET)", "/jobs/<job_id>/events (GET, SSE)",
+                      "/jobs/<job_id>/result (GET)", "/generate_itinerary (GET)", "/chatbot/<key>/stream (POST, SSE)"]
     })
 
 @app.route('/submit_trip_data', methods=['POST'])
@@ -50,35 +93,173 @@ def submit_trip_data():
         required = ['start_date', 'end_date', 'from', 'to', 'additionalInfo', 'people']
         if not all(field in data for field in required):
             return jsonify({"error": "Missing required fields"}), 400
-        # Use global keyword to modify the global variable
-        global trip_data_store
-        # Generate itinerary and store it with a key
-        itinerary_data = make_itinerary(data)
-        trip_data_store["here"] = itinerary_data
-        
-        return jsonify({"message": "Trip data stored"})
+        # Generate itinerary in the background; the client polls /jobs/<job_id>
+        trip_id = uuid.uuid4().hex
+        job = job_manager.submit(run_trip_job, trip_id, data, job_id=trip_id)
+
+        return jsonify({"message": "Trip data submitted", "job_id": job.job_id, "trip_id": trip_id, "status": job.status}), 202
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         logger.error(f"Error in /submit_trip_data: {str(e)}")
         return jsonify({"error": str(e)}), 500
-    
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        # The job may have run in another worker; its trip is still in the shared store
+        if trip_store.get(job_id) is not None:
+            return jsonify({"job_id": job_id, "status": DONE})
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        # Finished in another worker; all that is left to report is that it's done
+        if trip_store.get(job_id) is not None:
+            return event_stream(sse_event(DONE, {"event": DONE, "job_id": job_id}))
+        return jsonify({"error": "Unknown job id"}), 404
+
+    # A reconnecting EventSource resumes after the last event it saw
+    last_id = request.headers.get("Last-Event-ID", "")
+    start = int(last_id) + 1 if last_id.isdigit() else 0
+
+    def frames():
+        yield "retry: 2000\n\n"
+        for event in job_manager.follow(job_id, start=start):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield sse_event(event["event"], event, event["id"])
+
+    return event_stream(frames())
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is not None and job.status == FAILED:
+        return jsonify({"error": job.error}), 500
+    if job is not None and job.status != DONE:
+        return jsonify(job.to_dict()), 202
+    itinerary_data = trip_store.get(job_id)
+    if itinerary_data is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(itinerary_data)
+
+
+@app.route('/stats/http', methods=['GET'])
+def http_stats():
+    return jsonify(http_client.pool_stats())
+
+
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "llm": llm_cache.get().stats(),
+        "geocode": geocode_cache.get().stats(),
+        "airport_coords": coordinate_cache.get().stats()
+    })
+
 
 @app.route('/generate_itinerary/<itinerary_key>', methods=['GET'])
 def generate_itinerary(itinerary_key):
     try:
-        return jsonify(trip_data_store["here"][itinerary_key])
+        trip_id = resolve_trip_id()
+        if trip_id is None:
+            return jsonify({"error": "Missing trip_id"}), 400
+        itinerary_data = trip_store.get(trip_id)
+        if itinerary_data is None or itinerary_key not in itinerary_data:
+            return jsonify({"error": "Itinerary not found"}), 404
+        return jsonify(itinerary_data[itinerary_key])
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
     except Exception as e:
         logger.error(f"Error in /generate_itinerary: {str(e)}")
         return jsonify({"error": str(e)}), 500
     
+def load_itinerary_for_edit(itinerary_key):
+    trip_id = resolve_trip_id()
+    itinerary_data = trip_store.get(trip_id) if trip_id else None
+    if itinerary_data is None or itinerary_key not in itinerary_data:
+        return trip_id, None
+    return trip_id, itinerary_data
+
+
+def save_edit(trip_id, itinerary_data, itinerary_key, updated):
+    # Copy so other requests holding the cached result never see a half-applied edit
+    itinerary_data = dict(itinerary_data)
+    itinerary_data[itinerary_key] = updated
+    trip_store.put(trip_id, itinerary_data)
+
+
 @app.route('/chatbot/<itinerary_key>', methods=['POST'])
 def chatbot_edit(itinerary_key):
-    print("this is before", trip_data_store["here"])
-    trip_data_store["here"][itinerary_key]=json.loads(edit_itinerary(trip_data_store["here"][itinerary_key], json.dumps(request.get_json()), []))
-    print("this is  after the edit", trip_data_store["here"])
-    return jsonify({"message": "Chatbot response generated"})
+    trip_id, itinerary_data = load_itinerary_for_edit(itinerary_key)
+    if trip_id is None:
+        return jsonify({"error": "Missing trip_id"}), 400
+    if itinerary_data is None:
+        return jsonify({"error": "Itinerary not found"}), 404
+    message = json.dumps(request.get_json())
+    current = itinerary_data[itinerary_key]
+
+    # Ask for a small patch first; only regenerate the whole option if the
+    # model's patch can't be applied
+    ops = None
+    try:
+        ops = edit_itinerary_patch(current, message, [])
+        updated = apply_patch(current, ops)
+    except Exception as e:
+        logger.warning(f"Patch edit failed, regenerating itinerary: {str(e)}")
+        ops = None
+        try:
+            updated = json.loads(edit_itinerary(current, message, []))
+        except Exception as e:
+            logger.error(f"Error in /chatbot: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    save_edit(trip_id, itinerary_data, itinerary_key, updated)
+    return jsonify({"message": "Chatbot response generated", "ops": ops})
+
+
+@app.route('/chatbot/<itinerary_key>/stream', methods=['POST'])
+def chatbot_edit_stream(itinerary_key):
+    """Same edit as /chatbot/<key>, streamed as server-sent events while Gemini writes it."""
+    trip_id, itinerary_data = load_itinerary_for_edit(itinerary_key)
+    if trip_id is None:
+        return jsonify({"error": "Missing trip_id"}), 400
+    if itinerary_data is None:
+        return jsonify({"error": "Itinerary not found"}), 404
+    message = json.dumps(request.get_json())
+    current = itinerary_data[itinerary_key]
+
+    def frames():
+        yield sse_event("status", {"message": "Editing itinerary"})
+        try:
+            try:
+                chunks = []
+                for text in stream_itinerary_patch(current, message, []):
+                    chunks.append(text)
+                    yield sse_event("delta", {"text": text})
+                ops = json.loads("".join(chunks)).get("ops", [])
+                updated = apply_patch(current, ops)
+            except Exception as e:
+                logger.warning(f"Patch edit failed, regenerating itinerary: {str(e)}")
+                yield sse_event("status", {"message": "Regenerating itinerary"})
+                ops = None
+                updated = json.loads(edit_itinerary(current, message, []))
+            save_edit(trip_id, itinerary_data, itinerary_key, updated)
+            yield sse_event("done", {"ops": ops, "itinerary": updated})
+        except Exception as e:
+            logger.error(f"Error in /chatbot stream: {str(e)}")
+            yield sse_event("error", {"error": str(e)})
 
+    return event_stream(frames())
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
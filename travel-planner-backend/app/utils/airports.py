@@ -0,0 +1,230 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from array import array
+from bisect import bisect_left
+import unicodedata
+import difflib
+import logging
+import csv
+import re
+import os
+from app.utils.cache import PersistentCache
+from app.utils.geocode_cache import COUNTRY_ALIASES
+from app.utils.lazy import Lazy
+from app.utils.storage import data_path
+
+logger = logging.getLogger(__name__)
+
+DATASET_PATH = os.getenv(
+    "AIRPORTS_DATASET_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "airports.csv")
+)
+
+# Prefixes shorter than this match too many cities to be worth guessing from
+MIN_PREFIX = 4
+FUZZY_CUTOFF = 0.8
+# Longest city name or alias, in words, looked for inside free text
+MAX_NAME_WORDS = 4
+
+# Coordinates fetched from Amadeus for codes the bundled index doesn't have.
+# Airports don't move, so entries effectively live for the deployment
+coordinate_cache: Lazy[PersistentCache] = Lazy(lambda: PersistentCache(
+    path=os.getenv("AIRPORT_COORDS_CACHE_PATH", data_path("airport_coords.sqlite3")),
+    ttl=float(os.getenv("AIRPORT_COORDS_CACHE_TTL_SECONDS", str(365 * 24 * 3600))),
+    negative_ttl=float(os.getenv("AIRPORT_COORDS_NEGATIVE_TTL_SECONDS", "3600")),
+    max_memory=int(os.getenv("AIRPORT_COORDS_CACHE_MEMORY_ENTRIES", "1024"))
+))
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(text: str) -> str:
+    """Lower-case, strip accents and collapse punctuation so "Zürich" and "zurich" compare equal."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+class AirportIndex:
+    """
+    In-memory index of the primary international airports of major cities.
+
+    Airports are stored column-wise (codes, countries and float arrays of
+    coordinates) and every city name and alias is kept in one sorted list that
+    parallels a list of airport row tuples. Exact and prefix lookups are a
+    bisect over that list; fuzzy matching only runs when both miss.
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, str]]):
+        self.codes: List[str] = []
+        self.countries: List[str] = []
+        self.lats = array("d")
+        self.lons = array("d")
+        self._by_code: Dict[str, int] = {}
+
+        names: Dict[str, List[int]] = {}
+        for row in rows:
+            index = len(self.codes)
+            code = row["iata"].strip().upper()
+            self.codes.append(code)
+            self.countries.append(row["country"].strip().lower())
+            self.lats.append(float(row["lat"]))
+            self.lons.append(float(row["lon"]))
+            self._by_code[code] = index
+            for name in [row["city"], *(row.get("aliases") or "").split("|")]:
+                name = normalize_name(name)
+                if name:
+                    names.setdefault(name, []).append(index)
+
+        self.keys: List[str] = sorted(names)
+        self._rows: List[Tuple[int, ...]] = [tuple(names[key]) for key in self.keys]
+
+    @classmethod
+    def load(cls, path: str = DATASET_PATH) -> "AirportIndex":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def coordinates(self, code: str) -> Optional[Dict[str, float]]:
+        """{"lat", "lon"} of an airport by IATA code, or None if it isn't indexed."""
+        index = self._by_code.get(code.strip().upper())
+        if index is None:
+            return None
+        return {"lat": self.lats[index], "lon": self.lons[index]}
+
+    def lookup(self, name: str) -> Optional[Tuple[int, ...]]:
+        """Airport rows for an already-normalized city name or alias."""
+        position = bisect_left(self.keys, name)
+        if position < len(self.keys) and self.keys[position] == name:
+            return self._rows[position]
+        return None
+
+    def complete(self, prefix: str) -> List[str]:
+        """Indexed names starting with an already-normalized prefix."""
+        position = bisect_left(self.keys, prefix)
+        matches = []
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            matches.append(self.keys[position])
+            position += 1
+        return matches
+
+    def resolve(self, text: str) -> Dict[str, Dict[str, float]]:
+        """
+        Airports for a place the user typed, as {code: {"lat", "lon"}}.
+
+        Accepts "Paris", "Paris, France", an IATA code or a sentence naming one
+        city. Returns {} when the input can't be resolved with confidence, so
+        the caller can fall back to something smarter.
+        """
+        parts = [normalize_name(part) for part in text.split(",")]
+        parts = [part for part in parts if part]
+        if not parts:
+            return {}
+
+        country = None
+        if len(parts) > 1:
+            raw = text.split(",")[-1].strip().lower()
+            country = COUNTRY_ALIASES.get(raw, parts[-1] if len(parts[-1]) == 2 else None)
+
+        rows = self._match(parts[0], text.strip())
+        if rows is None:
+            rows = self._scan(normalize_name(text))
+        if not rows:
+            return {}
+
+        if len(parts) > 1:
+            # A trailing region that is itself indexed ("San Jose, Costa Rica") narrows the match
+            region = set(self.lookup(parts[-1]) or ()) & set(rows)
+            if region:
+                rows, country = tuple(sorted(region)), None
+            elif not country:
+                # Any other qualifier ("Paris, Texas") may name a different
+                # place with the same name, so only a known country confirms it
+                return {}
+        rows = self._in_country(rows, country)
+        return {self.codes[i]: {"lat": self.lats[i], "lon": self.lons[i]} for i in rows}
+
+    def _match(self, name: str, raw: str) -> Optional[Tuple[int, ...]]:
+        rows = self.lookup(name)
+        if rows is not None:
+            return rows
+
+        if len(raw) == 3 and raw.isalpha() and raw.upper() in self._by_code:
+            return (self._by_code[raw.upper()],)
+
+        if len(name) >= MIN_PREFIX:
+            candidates = {self.lookup(key) for key in self.complete(name)}
+            if len(candidates) == 1:
+                return candidates.pop()
+
+        if len(name.split()) <= MAX_NAME_WORDS:
+            close = difflib.get_close_matches(name, self.keys, n=1, cutoff=FUZZY_CUTOFF)
+            if close:
+                logger.debug(f"Fuzzy matched airport city {name!r} to {close[0]!r}")
+                return self.lookup(close[0])
+        return None
+
+    def _scan(self, text: str) -> Optional[Tuple[int, ...]]:
+        """Rows for the one city named somewhere in free text, longest names first."""
+        words = text.split()
+        used = [False] * len(words)
+        found = []
+        for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                if any(used[start:start + size]):
+                    continue
+                rows = self.lookup(" ".join(words[start:start + size]))
+                if rows is not None:
+                    found.append(set(rows))
+                    used[start:start + size] = [True] * size
+        if not found:
+            return None
+
+        # "San Jose, Costa Rica" names two places that share one airport; two
+        # unrelated cities are ambiguous and left to the caller
+        common = set.intersection(*found)
+        return tuple(sorted(common)) if common else None
+
+    def _in_country(self, rows: Tuple[int, ...], country: Optional[str]) -> Tuple[int, ...]:
+        if country:
+            # Empty when the city is elsewhere, e.g. "Manchester, NH"
+            return tuple(i for i in rows if self.countries[i] == country)
+        # A name shared by cities in several countries resolves to the first listed
+        first = self.countries[rows[0]]
+        return tuple(i for i in rows if self.countries[i] == first)
+
+
+def _load_index() -> AirportIndex:
+    index = AirportIndex.load()
+    logger.info(f"Loaded {len(index)} airports from {DATASET_PATH}")
+    return index
+
+
+_index: Lazy[AirportIndex] = Lazy(_load_index)
+
+
+def get_index() -> AirportIndex:
+    return _index.get()
+
+
+def resolve(text: str) -> Dict[str, Dict[str, float]]:
+    return get_index().resolve(text)
+
+
+def coordinates(code: str) -> Optional[Dict[str, float]]:
+    return get_index().coordinates(code)
+
+
+def cached_coordinates(code: str, resolver: Callable[[str], Optional[Dict[str, float]]]) -> Optional[Dict[str, float]]:
+    """
+    {"lat", "lon"} for an IATA code, from the bundled index or the coordinate cache.
+
+    resolver is only called for codes seen neither there nor in the cache, and
+    at most once at a time per code.
+    """
+    code = code.strip().upper()
+    known = coordinates(code)
+    if known is not None:
+        return known
+    return coordinate_cache.get().get_or_compute(code, lambda: resolver(code))
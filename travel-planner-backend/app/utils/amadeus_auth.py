@@ -0,0 +1,145 @@
+from typing import Any, Dict, Optional, Tuple
+import threading
+import logging
+import time
+import os
+import requests
+from dotenv import load_dotenv
+from app.utils import http_client
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+TOKEN_URL = "https://test.api.amadeus.com/v1/security/oauth2/token"
+
+
+class AmadeusTokenProvider:
+    """
+    Thread-safe holder for one Amadeus client-credentials token.
+
+    The token is reused until `expires_in` runs out. Once it is within
+    `refresh_margin` seconds of expiring, the next caller starts a single
+    background refresh and keeps using the still-valid token. Only when there is
+    no valid token at all do callers block, and then they wait on one shared
+    POST rather than each minting their own. The background refresh flag has
+    its own lock, so callers holding a valid token never wait behind that POST.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, token_url: str = TOKEN_URL, refresh_margin: float = 300):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+
+    def get_token(self) -> str:
+        """Return a valid access token, fetching one only if none is usable."""
+        now = time.time()
+        token, expires_at = self._token, self._expires_at
+        if token and now < expires_at:
+            if now >= expires_at - self.refresh_margin:
+                self._refresh_in_background()
+            return token
+
+        with self._lock:
+            # Another thread may have fetched while we waited for the lock
+            if self._token and time.time() < self._expires_at:
+                return self._token
+            return self._fetch()
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """
+        Drop the current token, e.g. after the API rejects it with a 401.
+
+        With token given, only drop it if it is still the current one, so a
+        burst of 401s for an old token doesn't discard its replacement.
+        """
+        with self._lock:
+            if token is not None and token != self._token:
+                return
+            self._token = None
+            self._expires_at = 0.0
+
+    def _fetch(self) -> str:
+        # Caller must hold self._lock
+        payload = {
+            'grant_type': 'client_credentials',
+            'client_id': self.client_id,
+            'client_secret': self.client_secret
+        }
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        response = http_client.post(self.token_url, data=payload, headers=headers)
+        response.raise_for_status()
+        body = response.json()
+        self._token = body['access_token']
+        self._expires_at = time.time() + float(body.get('expires_in', 1799))
+        return self._token
+
+    def _refresh_in_background(self) -> None:
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="amadeus-token-refresh", daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                if time.time() < self._expires_at - self.refresh_margin:
+                    return
+                self._fetch()
+        except Exception as e:
+            # The current token is still valid; the next caller will try again
+            logger.error(f"Amadeus token refresh failed: {str(e)}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+
+
+_providers: Dict[Tuple[str, str], AmadeusTokenProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(client_id: Optional[str] = None, client_secret: Optional[str] = None) -> AmadeusTokenProvider:
+    """Shared provider for a set of credentials, defaulting to AMADEUS_API_KEY/AMADEUS_API_SECRET."""
+    client_id = client_id or os.getenv("AMADEUS_API_KEY")
+    client_secret = client_secret or os.getenv("AMADEUS_API_SECRET")
+    if not client_id or not client_secret:
+        raise ValueError("AMADEUS_API_KEY and AMADEUS_API_SECRET must be set")
+
+    key = (client_id, client_secret)
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = AmadeusTokenProvider(client_id, client_secret)
+            _providers[key] = provider
+        return provider
+
+
+def get_access_token(client_id: Optional[str] = None, client_secret: Optional[str] = None) -> str:
+    """Return a cached, unexpired Amadeus access token."""
+    return get_provider(client_id, client_secret).get_token()
+
+
+def get(url: str, access_token: Optional[str] = None, client_id: Optional[str] = None,
+        client_secret: Optional[str] = None, headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> requests.Response:
+    """
+    GET an Amadeus endpoint with a bearer token, the shared one by default.
+
+    A 401 means the token was revoked before its expiry, so it is invalidated
+    and the request is retried once with a freshly fetched token.
+    """
+    provider = get_provider(client_id, client_secret)
+    token = access_token or provider.get_token()
+    response = http_client.get(url, headers={**(headers or {}), "Authorization": f"Bearer {token}"}, **kwargs)
+    if response.status_code != 401:
+        return response
+
+    logger.warning("Amadeus rejected the access token, fetching a new one")
+    response.close()
+    provider.invalidate(token)
+    return http_client.get(url, headers={**(headers or {}), "Authorization": f"Bearer {provider.get_token()}"}, **kwargs)
@@ -1,7 +1,23 @@
-from typing import List, Dict, Any, Optional
-import overpy
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
 import json
-from geopy.geocoders import Nominatim
+import re
+import os
+from app.utils import http_client
+from app.utils.geocode_cache import cached_geocode
+from app.utils.lazy import Lazy
+from app.utils.overpass_cache import get_cache
+from app.utils.overpass_stream import iter_place_records
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+def _make_geolocator():
+    from geopy.geocoders import Nominatim
+    return Nominatim(user_agent="travel_buddy")
+
+
+# One geolocator per process so geopy keeps its keep-alive session between calls;
+# built on the first cache miss rather than at import
+geolocator = Lazy(_make_geolocator)
 
 # OSM Tags mapping for different categories
 OSM_TAGS = {
@@ -62,9 +78,12 @@ OSM_TAGS = {
 }
 
 def get_location_coordinates(location: str) -> Optional[Dict[str, float]]:
+    """Get latitude and longitude for a given location name, from the geocode cache when possible."""
+    return cached_geocode(location, geocode_nominatim)
+
+def geocode_nominatim(location: str) -> Optional[Dict[str, float]]:
     """Get latitude and longitude for a given location name using geopy."""
-    geolocator = Nominatim(user_agent="travel_buddy")
-    location_data = geolocator.geocode(location)
+    location_data = geolocator.get().geocode(location)
     if location_data:
         return {
             "lat": location_data.latitude,
@@ -72,77 +91,172 @@ def get_location_coordinates(location: str) -> Optional[Dict[str, float]]:
         }
     return None
 
+# Tags the pipeline actually reads; everything else is dropped while parsing
+PLACE_TAGS = {"name", "description", "website", "contact:website", "price", "rating", "cuisine", "opening_hours"}
+
+# Category keys kept on every cached record whichever query filled its tile:
+# OSM_TAGS and the POI theme tables match on them, and record_to_place reads
+# the type from amenity/tourism/leisure
+CATEGORY_KEYS = {tag_key for tags in OSM_TAGS.values() for tag_key, _ in tags} | {
+    "amenity", "building", "historic", "leisure", "natural", "shop", "tourism"
+}
+
+# Per-category (tag key) cap on elements Overpass returns
+CATEGORY_LIMIT = int(os.getenv("OVERPASS_CATEGORY_LIMIT", "200"))
+
+def _regex_escape(value: str) -> str:
+    return re.sub(r'([\\.^$|?*+()\[\]{}"])', r"\\\1", value)
+
+def group_tags_by_key(tags: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    grouped: Dict[str, List[str]] = {}
+    for tag_key, tag_value in tags:
+        values = grouped.setdefault(tag_key, [])
+        if tag_value not in values:
+            values.append(tag_value)
+    return grouped
+
+def build_compact_query(tags: List[Tuple[str, str]], area_filter: str, limit: Optional[int] = CATEGORY_LIMIT) -> str:
+    """
+    Build an Overpass query with one `nwr` statement per tag key.
+
+    Values sharing a key are matched with a single anchored regex alternation,
+    and each key gets its own `out tags center` so the cap applies per category.
+    `out tags` skips way node lists and relation members, which we never read.
+    """
+    statements = []
+    for tag_key, values in group_tags_by_key(tags).items():
+        if len(values) == 1:
+            selector = f'["{tag_key}"="{values[0]}"]'
+        else:
+            selector = f'["{tag_key}"~"^({"|".join(_regex_escape(value) for value in values)})$"]'
+        statements.append(f"nwr{selector}({area_filter});")
+        statements.append(f"out tags center {limit};" if limit else "out tags center;")
+
+    query = """
+[out:json][timeout:25];
+%s
+""" % ("\n".join(statements))
+    return query
+
 def build_overpass_query(lat: float, lon: float, radius: int, kinds: Optional[List[str]] = None) -> str:
     """Build an Overpass API query based on location and preferences."""
+    return build_compact_query(kinds_to_tags(kinds), f"around:{radius},{lat},{lon}")
+
+def kinds_to_tags(kinds: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """Expand category names from OSM_TAGS into their (key, value) tag pairs."""
     if not kinds:
         # Default to popular tags if no kinds specified
         kinds = ["outdoors", "art", "history", "food"]
-        
-    query_parts = []
+    tags = []
     for kind in kinds:
-        if kind in OSM_TAGS:
-            for tag_key, tag_value in OSM_TAGS[kind]:
-                query_parts.append(f"node[\"{tag_key}\"=\"{tag_value}\"](around:{radius},{lat},{lon});")
-                query_parts.append(f"way[\"{tag_key}\"=\"{tag_value}\"](around:{radius},{lat},{lon});")
-                query_parts.append(f"relation[\"{tag_key}\"=\"{tag_value}\"](around:{radius},{lat},{lon});")
-    
-    query = """
-[out:json][timeout:25];
-(
-    %s
-);
-out body center;
-""" % ("\n    ".join(query_parts))
-    return query
+        for tag in OSM_TAGS.get(kind, []):
+            if tag not in tags:
+                tags.append(tag)
+    return tags
 
-def fetch_osm_places(lat: float, lon: float, radius: int = 5000, kinds: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-    """Fetch places from OpenStreetMap using Overpass API."""
-    api = overpy.Overpass()
-    query = build_overpass_query(lat, lon, radius, kinds)
+def build_overpass_bbox_query(bbox: Tuple[float, float, float, float], tags: List[Tuple[str, str]]) -> str:
+    """Build an Overpass API query for tagged elements inside a (south, west, north, east) box."""
+    south, west, north, east = bbox
+    return build_compact_query(tags, f"{south},{west},{north},{east}")
+
+def query_overpass(query: str, keep_tags: Optional[set] = None,
+                   on_element: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Run an Overpass query and return compact records for its nodes and way centers.
+
+    The response is parsed as it streams in, so the raw document is never held
+    in memory. If keep_tags is given, only those tag keys are kept on each record;
+    on_element is passed to iter_place_records.
+    """
+    response = http_client.post(OVERPASS_URL, data=query.encode("utf-8"), timeout=(5, 60), stream=True)
+    try:
+        response.raise_for_status()
+        return list(iter_place_records(response.iter_content(chunk_size=64 * 1024), keep_tags, on_element))
+    finally:
+        response.close()
+
+def count_elements_by_key(tags: List[Tuple[str, str]]) -> Tuple[Dict[str, int], Callable[[Dict[str, Any]], None]]:
+    """
+    Per-key element counts for a build_compact_query response, and the on_element callback that fills them.
+
+    Every raw element is counted, including those iter_place_records drops,
+    since Overpass caps each `out` before any of that. An element output by
+    one key's statement carries that key, so it is always counted there; one
+    that also carries another queried key counts for both, which errs towards
+    calling the response capped.
+    """
+    grouped = {tag_key: set(values) for tag_key, values in group_tags_by_key(tags).items()}
+    counts = {tag_key: 0 for tag_key in grouped}
+
+    def count(element: Dict[str, Any]) -> None:
+        element_tags = element.get("tags") or {}
+        for tag_key, values in grouped.items():
+            if element_tags.get(tag_key) in values:
+                counts[tag_key] += 1
+
+    return counts, count
+
+def hit_category_limit(counts: Dict[str, int], limit: Optional[int] = CATEGORY_LIMIT) -> bool:
+    """Whether any per-key `out` statement may have been cut off by its cap."""
+    return bool(limit) and any(count >= limit for count in counts.values())
+
+def fetch_tiles(bbox: Tuple[float, float, float, float], tags: List[Tuple[str, str]]) -> Tuple[List[Dict[str, Any]], bool]:
+    """Fill callback for the tile cache: records in bbox, and whether none of the per-key caps was reached."""
+    counts, count = count_elements_by_key(tags)
+    records = query_overpass(build_overpass_bbox_query(bbox, tags),
+                             keep_tags=PLACE_TAGS | CATEGORY_KEYS | {tag_key for tag_key, _ in tags}, on_element=count)
+    return records, not hit_category_limit(counts)
+
+def record_to_place(record: Dict[str, Any]) -> Dict[str, Any]:
+    tags = dict(record["tags"])
+    return {
+        "name": tags.get("name", "Unknown"),
+        "description": tags.get("description", ""),
+        "type": tags.get("amenity", tags.get("tourism", tags.get("leisure", ""))),
+        "location": [record["lat"], record["lon"]],
+        "tags": record["tags"],
+        "osm_id": record["osm_id"],
+        "osm_type": record["osm_type"]
+    }
+
+def iter_osm_records(lat: float, lon: float, radius: int = 5000, kinds: Optional[List[str]] = None,
+                     tags: Optional[List[List[str]]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Compact Overpass records near (lat, lon), reusing cached map tiles where possible.
+
+    Explicit (key, value) tags take precedence over category names in kinds.
+    Cached tiles are decoded as the records are consumed; tiles fetched from
+    Overpass arrive as one list, since they are split and cached together.
+    """
+    tags = [tuple(tag) for tag in tags] if tags else kinds_to_tags(kinds)
     try:
-        result = api.query(query)
-        places = []
-        for node in result.nodes:
-            place = {
-                "name": node.tags.get("name", "Unknown"),
-                "description": node.tags.get("description", ""),
-                "type": node.tags.get("amenity", node.tags.get("tourism", node.tags.get("leisure", ""))),
-                "location": [node.lat, node.lon],
-                "tags": list(node.tags.items()),
-                "osm_id": node.id,
-                "osm_type": "node"
-            }
-            places.append(place)
-        
-        # For ways, use the center point provided by Overpass
-        for way in result.ways:
-            if way.center_lat is not None and way.center_lon is not None:
-                place = {
-                    "name": way.tags.get("name", "Unknown"),
-                    "description": way.tags.get("description", ""),
-                    "type": way.tags.get("amenity", way.tags.get("tourism", way.tags.get("leisure", ""))),
-                    "location": [way.center_lat, way.center_lon],
-                    "tags": list(way.tags.items()),
-                    "osm_id": way.id,
-                    "osm_type": "way"
-                }
-                places.append(place)
-        
-        return places
-        
+        yield from get_cache().iter_fetch(lat, lon, radius, tags, fetch_tiles)
+
     except Exception as e:
         print(f"Error fetching places: {str(e)}")
-        return []
 
-def fetch_places(location: str, kinds: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-    """Fetch points of interest for a given location using OpenStreetMap."""
+def fetch_osm_records(lat: float, lon: float, radius: int = 5000, kinds: Optional[List[str]] = None,
+                      tags: Optional[List[List[str]]] = None) -> List[Dict[str, Any]]:
+    return list(iter_osm_records(lat, lon, radius, kinds, tags))
+
+def iter_osm_places(lat: float, lon: float, radius: int = 5000, kinds: Optional[List[str]] = None,
+                    tags: Optional[List[List[str]]] = None) -> Iterator[Dict[str, Any]]:
+    """Places from iter_osm_records, each built only when the consumer asks for it."""
+    return map(record_to_place, iter_osm_records(lat, lon, radius, kinds, tags))
+
+def fetch_osm_places(lat: float, lon: float, radius: int = 5000, kinds: Optional[List[str]] = None,
+                     tags: Optional[List[List[str]]] = None) -> List[Dict[str, Any]]:
+    """Fetch places from OpenStreetMap using Overpass API, reusing cached map tiles where possible."""
+    return list(iter_osm_places(lat, lon, radius, kinds, tags))
+
+def iter_places(location: str, kinds: Optional[List[str]] = None, tags: Optional[List[List[str]]] = None) -> Iterator[Dict[str, Any]]:
+    """Points of interest for a given location, yielded one at a time."""
     coords = get_location_coordinates(location)
     if not coords:
         raise ValueError(f"Could not find coordinates for location: {location}")
-        
-    places = fetch_osm_places(
-        lat=coords["lat"],
-        lon=coords["lon"],
-    )
-    
-    return places
+
+    return iter_osm_places(lat=coords["lat"], lon=coords["lon"], kinds=kinds, tags=tags)
+
+def fetch_places(location: str, kinds: Optional[List[str]] = None, tags: Optional[List[List[str]]] = None) -> List[Dict[str, Any]]:
+    """Fetch points of interest for a given location using OpenStreetMap."""
+    return list(iter_places(location, kinds=kinds, tags=tags))
@@ -0,0 +1,125 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+import logging
+import json
+import time
+from app.utils.storage import SQLiteDB
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class PersistentCache:
+    """
+    Two-tier cache for slow lookups whose results are JSON-serializable.
+
+    A bounded in-process LRU sits in front of a SQLite table that survives
+    restarts and is shared by every worker on the host. Entries expire after
+    `ttl` seconds; a None result is cached too (negative caching) but only for
+    `negative_ttl`, so a transient miss is retried sooner. Concurrent misses for
+    the same key are collapsed onto one call to the compute function.
+    """
+
+    def __init__(self, path: str, ttl: float, negative_ttl: Optional[float] = None, max_memory: int = 1024):
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_memory = max_memory
+        self.db = SQLiteDB(path, schema=[
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        ])
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "negative_hits": 0, "deduplicated": 0}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Cached value for key, or default if it is absent or expired."""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.time() + (self.negative_ttl if value is None else self.ttl)
+        with self.db.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+        self._remember(key, expires_at, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling compute() once on a miss."""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = threading.Event()
+                self._inflight[key] = event
+            else:
+                self.metrics["deduplicated"] += 1
+
+        if not leader:
+            event.wait()
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            # The leader failed; try ourselves rather than fail on its behalf
+            return compute()
+
+        try:
+            with self._lock:
+                self.metrics["misses"] += 1
+            value = compute()
+            self.set(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _lookup(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.metrics["memory_hits"] += 1
+                    if entry[1] is None:
+                        self.metrics["negative_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        row = self.db.connection().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return _MISSING
+
+        value = json.loads(row[0])
+        with self._lock:
+            self.metrics["disk_hits"] += 1
+            if value is None:
+                self.metrics["negative_hits"] += 1
+        self._remember(key, row[1], value)
+        return value
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
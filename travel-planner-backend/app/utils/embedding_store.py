@@ -0,0 +1,183 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+import threading
+import hashlib
+import os
+import numpy as np
+from app.utils.storage import SQLiteDB
+
+# Appends are serialized across processes with flock on POSIX and
+# msvcrt.locking on Windows, which has no fcntl
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+ROW_DTYPE = np.float32
+
+
+def _lock_file(f) -> None:
+    """Block until this process holds the exclusive append lock on the open file f."""
+    if os.name != "nt":
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return
+    # Windows locks byte ranges; every writer locks byte 0, which may lie past
+    # the end of the file. LK_LOCK gives up after about 10s, so keep trying
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(f) -> None:
+    if os.name != "nt":
+        fcntl.flock(f, fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def text_key(namespace: str, text: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(namespace.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Append-only store of float32 embeddings, memory-mapped for reads.
+
+    Vectors live as fixed-width rows in `<namespace>.f32` and a SQLite table
+    maps a hash of each text to its row. Readers map the file read-only, so
+    every worker on the host shares the same page cache instead of holding its
+    own copy, and a restart finds everything encoded before. Appends take an
+    exclusive file lock and write the row before indexing it, so a row is never
+    visible before its data. The most recently used vectors are also kept in a
+    bounded per-process LRU.
+    """
+
+    def __init__(self, path: str, dim: int, namespace: str, max_hot: int = 4096):
+        os.makedirs(path, exist_ok=True)
+        self.dim = dim
+        self._row_bytes = dim * np.dtype(ROW_DTYPE).itemsize
+        self.namespace = namespace
+        self.max_hot = max_hot
+        safe_name = "".join(char if char.isalnum() or char in "-_." else "_" for char in namespace)
+        self.data_path = os.path.join(path, f"{safe_name}.f32")
+        self.db = SQLiteDB(os.path.join(path, f"{safe_name}.sqlite3"), schema=[
+            "CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER NOT NULL)",
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        ])
+        self._check_dim()
+        self._hot: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._map: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self.metrics = {"hot_hits": 0, "mapped_hits": 0, "misses": 0, "appended": 0}
+
+    def get_many(self, texts: Sequence[str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """Stored vectors for texts, and the texts that have none yet."""
+        keys = {text: text_key(self.namespace, text) for text in dict.fromkeys(texts)}
+        found: Dict[str, np.ndarray] = {}
+        cold = []
+        with self._lock:
+            for text, key in keys.items():
+                vector = self._hot.get(key)
+                if vector is None:
+                    cold.append(text)
+                    continue
+                self._hot.move_to_end(key)
+                found[text] = vector
+            self.metrics["hot_hits"] += len(found)
+
+        rows = self._rows([keys[text] for text in cold])
+        missing = []
+        for text in cold:
+            row = rows.get(keys[text])
+            vector = self._read(row) if row is not None else None
+            if vector is None:
+                missing.append(text)
+                continue
+            found[text] = vector
+            self._remember(keys[text], vector)
+        with self._lock:
+            self.metrics["mapped_hits"] += len(cold) - len(missing)
+            self.metrics["misses"] += len(missing)
+        return found, missing
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Append vectors for texts that aren't stored yet."""
+        vectors = np.ascontiguousarray(vectors, dtype=ROW_DTYPE).reshape(len(texts), self.dim)
+        keys = [text_key(self.namespace, text) for text in texts]
+        with open(self.data_path, "ab") as f:
+            _lock_file(f)
+            try:
+                # Another worker may have stored some of these since we looked
+                known = self._rows(keys)
+                fresh = list(dict((key, vector) for key, vector in zip(keys, vectors) if key not in known).items())
+                if fresh:
+                    f.seek(0, os.SEEK_END)
+                    first_row = f.tell() // self._row_bytes
+                    # Drop a partial row left by a writer that died mid-append
+                    f.truncate(first_row * self._row_bytes)
+                    f.write(np.stack([vector for _, vector in fresh]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                    with self.db.connection() as conn:
+                        conn.executemany(
+                            "INSERT OR IGNORE INTO rows (key, row) VALUES (?, ?)",
+                            [(key, first_row + i) for i, (key, _) in enumerate(fresh)]
+                        )
+            finally:
+                _unlock_file(f)
+        for key, vector in zip(keys, vectors):
+            self._remember(key, vector.copy())
+        with self._lock:
+            self.metrics["appended"] += len(fresh)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["hot_entries"] = len(self._hot)
+        stats["rows"] = os.path.getsize(self.data_path) // self._row_bytes if os.path.exists(self.data_path) else 0
+        return stats
+
+    def _rows(self, keys: List[str]) -> Dict[str, int]:
+        rows = {}
+        conn = self.db.connection()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows.update(conn.execute(
+                f"SELECT key, row FROM rows WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return rows
+
+    def _read(self, row: int) -> Optional[np.ndarray]:
+        with self._lock:
+            if self._map is None or row >= len(self._map):
+                # The file grew since it was mapped (possibly in another worker)
+                size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+                count = size // self._row_bytes
+                if row >= count:
+                    return None
+                self._map = np.memmap(self.data_path, dtype=ROW_DTYPE, mode="r", shape=(count, self.dim))
+            # Copy the row out so the hot set doesn't pin the whole mapping
+            return np.array(self._map[row])
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._hot[key] = vector
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.max_hot:
+                self._hot.popitem(last=False)
+
+    def _check_dim(self) -> None:
+        with self.db.connection() as conn:
+            conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dim', ?)", (str(self.dim),))
+            stored = conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()[0]
+        if int(stored) != self.dim:
+            raise ValueError(f"Embedding store {self.data_path} holds {stored}-d vectors, not {self.dim}-d")
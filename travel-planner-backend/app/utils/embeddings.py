@@ -1,30 +1,101 @@
-from typing import List
-from sentence_transformers import SentenceTransformer
-import math
+from typing import Any, List, Sequence, Tuple
+import numpy as np
+import os
+from app.utils.embedding_store import EmbeddingStore
+from app.utils.lazy import Lazy
+from app.utils.storage import data_path
 
-# Load the sentence transformer model once
-model = SentenceTransformer("all-MiniLM-L6-v2")
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def _load_model() -> Any:
+    # sentence_transformers pulls in torch; only pay for it when something is encoded
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+
+# Load the sentence transformer model once, on first use
+model: Lazy[Any] = Lazy(_load_model)
+
+# Unit-length float32 vectors by text, so cosine similarity is a plain dot product.
+# Persisted and shared across workers; only a bounded hot set stays in RAM
+store: Lazy[EmbeddingStore] = Lazy(lambda: EmbeddingStore(
+    path=os.getenv("EMBEDDING_STORE_DIR", data_path("embeddings")),
+    dim=model.get().get_sentence_embedding_dimension(),
+    namespace=MODEL_NAME,
+    max_hot=int(os.getenv("EMBEDDING_HOT_ENTRIES", "4096"))
+))
+
+
+def encode(texts: Sequence[str]) -> np.ndarray:
+    """
+    Embeddings for texts as one contiguous (len(texts), dim) float32 matrix.
+
+    Rows are L2-normalized. Texts not seen before are encoded together in a
+    single batched model call and added to the store; stored ones are reused.
+    """
+    vectors_by_text = store.get()
+    if not texts:
+        return np.empty((0, vectors_by_text.dim), dtype=np.float32)
+    found, missing = vectors_by_text.get_many(texts)
+    if missing:
+        vectors = model.get().encode(missing, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32, copy=False)
+        vectors_by_text.put_many(missing, vectors)
+        found.update(zip(missing, vectors))
+    return np.stack([found[text] for text in texts])
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length; zero rows stay zero."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-10)
+
+
+def similarities(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarity of one query vector against every row of matrix, for unit-length inputs."""
+    return matrix @ query
+
+
+def top_k(query: np.ndarray, matrix: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indexes and scores of the k rows most similar to query, best first.
+
+    Uses a partial sort, so picking 10 from thousands of rows doesn't pay for
+    sorting all of them.
+    """
+    scores = similarities(query, matrix)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order, scores[order]
+
+
+def rank(query: str, texts: Sequence[str], k: int = 10) -> List[Tuple[int, float]]:
+    """(index, score) pairs for the k texts closest in meaning to query."""
+    indexes, scores = top_k(encode([query])[0], encode(texts), k)
+    return list(zip(indexes.tolist(), scores.tolist()))
 
-# Optional cache if you're embedding repeated queries
-embedding_cache = {}
 
 def get_embedding(text: str) -> List[float]:
     """Get semantic embedding for a given text using SentenceTransformer."""
-    if text in embedding_cache:
-        return embedding_cache[text]
-    
-    embedding = model.encode(text).tolist()
-    embedding_cache[text] = embedding
-    return embedding
+    return encode([text])[0].tolist()
+
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """Compute cosine similarity between two vectors."""
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    norm1 = math.sqrt(sum(a * a for a in vec1))
-    norm2 = math.sqrt(sum(b * b for b in vec2))
-    return dot_product / (norm1 * norm2 + 1e-10)
+    vec1 = np.asarray(vec1, dtype=np.float32)
+    vec2 = np.asarray(vec2, dtype=np.float32)
+    return float(vec1 @ vec2 / (np.linalg.norm(vec1) * np.linalg.norm(vec2) + 1e-10))
+
 
 if __name__ == "__main__":
     emb1 = get_embedding("outdoors nature hiking")
     emb2 = get_embedding("walk in the forest")
     print("Cosine similarity:", cosine_similarity(emb1, emb2))
+    print(rank("outdoors nature hiking", ["walk in the forest", "art museum", "mountain trail"], k=2))
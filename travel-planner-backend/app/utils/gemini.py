@@ -0,0 +1,39 @@
+from typing import Any, Dict
+import threading
+import os
+from dotenv import load_dotenv
+from app.utils.lazy import Lazy
+
+load_dotenv()
+
+DEFAULT_MODEL = "gemini-2.5-flash-preview-05-20"
+
+
+def _configure() -> Any:
+    # google.generativeai (and grpc under it) is slow to import, so it only
+    # happens the first time a model is actually needed
+    import google.generativeai as genai
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables")
+    genai.configure(api_key=api_key)
+    return genai
+
+
+genai_module: Lazy[Any] = Lazy(_configure)
+
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(name: str = DEFAULT_MODEL) -> Any:
+    """Shared GenerativeModel for name, configuring the client on first use."""
+    model = _models.get(name)
+    if model is None:
+        genai = genai_module.get()
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                model = _models[name] = genai.GenerativeModel(name)
+    return model
@@ -0,0 +1,118 @@
+from typing import Sequence, Tuple, Union
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+Coordinates = Union[Sequence[float], np.ndarray]
+# (south, west, north, east) in degrees; west > east when the box crosses the antimeridian
+BBox = Tuple[float, float, float, float]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km between two points, for one-off scalar use."""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _radians(values: Coordinates) -> np.ndarray:
+    return np.radians(np.asarray(values, dtype=np.float64))
+
+
+def _haversine(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_one_to_many(lat: float, lon: float, lats: Coordinates, lons: Coordinates) -> np.ndarray:
+    """Great-circle distance in km from (lat, lon) to every point of lats/lons."""
+    return _haversine(math.radians(lat), math.radians(lon), _radians(lats), _radians(lons))
+
+
+def haversine_many(lats1: Coordinates, lons1: Coordinates, lats2: Coordinates, lons2: Coordinates) -> np.ndarray:
+    """
+    Great-circle distance in km between every point of the first set and every
+    point of the second, as an (n, m) matrix.
+
+    Memory is n * m float64s, so split very large sets into row blocks.
+    """
+    lat1, lon1 = _radians(lats1)[:, None], _radians(lons1)[:, None]
+    lat2, lon2 = _radians(lats2)[None, :], _radians(lons2)[None, :]
+    return _haversine(lat1, lon1, lat2, lon2)
+
+
+def haversine_matrix(lats: Coordinates, lons: Coordinates) -> np.ndarray:
+    """Great-circle distance in km between every pair of points, as an (n, n) matrix."""
+    return haversine_many(lats, lons, lats, lons)
+
+
+def _equirectangular(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    # Longitude differences shrink by the cosine of the first point's latitude,
+    # which is one cosine per point rather than one per pair
+    dlon = lon2 - lon1
+    if dlon.size and max(np.ptp(lon1), np.ptp(lon2), abs(np.mean(lon2) - np.mean(lon1))) > np.pi:
+        # Only wrap across the antimeridian when the points can straddle it
+        dlon = (dlon + np.pi) % (2 * np.pi) - np.pi
+    x = dlon * np.cos(lat1)
+    y = lat2 - lat1
+    return EARTH_RADIUS_KM * np.sqrt(x * x + y * y)
+
+
+def equirectangular_one_to_many(lat: float, lon: float, lats: Coordinates, lons: Coordinates) -> np.ndarray:
+    """
+    Approximate distance in km from (lat, lon) to every point of lats/lons.
+
+    Treats the earth as flat around (lat, lon), which is within about 0.5% of
+    haversine over city distances (tens of km) away from the poles, and needs
+    no trigonometry per point.
+    """
+    return _equirectangular(np.float64(math.radians(lat)), np.float64(math.radians(lon)), _radians(lats), _radians(lons))
+
+
+def equirectangular_many(lats1: Coordinates, lons1: Coordinates, lats2: Coordinates, lons2: Coordinates) -> np.ndarray:
+    """(n, m) matrix of equirectangular_one_to_many distances from each point of the first set."""
+    lat1, lon1 = _radians(lats1)[:, None], _radians(lons1)[:, None]
+    lat2, lon2 = _radians(lats2)[None, :], _radians(lons2)[None, :]
+    return _equirectangular(lat1, lon1, lat2, lon2)
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> BBox:
+    """Smallest lat/lon box containing every point within radius_km of (lat, lon)."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = lat - dlat, lat + dlat
+    if south <= -90 or north >= 90:
+        # The circle reaches a pole, so every longitude is in range
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)))))
+    west, east = lon - dlon, lon + dlon
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def in_bounding_box(lats: Coordinates, lons: Coordinates, bbox: BBox) -> np.ndarray:
+    """Boolean mask of the points inside bbox."""
+    south, west, north, east = bbox
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    inside = (lats >= south) & (lats <= north)
+    if west <= east:
+        return inside & (lons >= west) & (lons <= east)
+    return inside & ((lons >= west) | (lons <= east))
+
+
+def within_radius(lat: float, lon: float, lats: Coordinates, lons: Coordinates, radius_km: float) -> np.ndarray:
+    """
+    Indexes of the points within radius_km of (lat, lon), in input order.
+
+    A bounding-box comparison discards most far points before the exact
+    haversine runs on the rest.
+    """
+    candidates = np.flatnonzero(in_bounding_box(lats, lons, bounding_box(lat, lon, radius_km)))
+    if not len(candidates):
+        return candidates
+    distances = haversine_one_to_many(lat, lon, np.asarray(lats)[candidates], np.asarray(lons)[candidates])
+    return candidates[distances <= radius_km]
@@ -0,0 +1,81 @@
+from typing import Callable, Dict, Optional
+import re
+import os
+from app.utils.cache import PersistentCache
+from app.utils.lazy import Lazy
+from app.utils.storage import data_path
+
+# Common spellings of a trailing country, mapped to one canonical form so that
+# "Austin, USA" and "austin,  United States" share a cache entry
+COUNTRY_ALIASES = {
+    "usa": "us",
+    "u.s.a.": "us",
+    "u.s.": "us",
+    "united states": "us",
+    "united states of america": "us",
+    "america": "us",
+    "uk": "gb",
+    "u.k.": "gb",
+    "united kingdom": "gb",
+    "great britain": "gb",
+    "england": "gb",
+    "france": "fr",
+    "italy": "it",
+    "italia": "it",
+    "spain": "es",
+    "españa": "es",
+    "germany": "de",
+    "deutschland": "de",
+    "japan": "jp",
+    "china": "cn",
+    "india": "in",
+    "canada": "ca",
+    "mexico": "mx",
+    "méxico": "mx",
+    "australia": "au",
+    "brazil": "br",
+    "brasil": "br",
+    "netherlands": "nl",
+    "the netherlands": "nl",
+    "portugal": "pt",
+    "greece": "gr",
+    "uae": "ae",
+    "united arab emirates": "ae",
+    "south korea": "kr",
+    "korea": "kr",
+    "thailand": "th",
+    "turkey": "tr",
+    "türkiye": "tr",
+}
+
+geocode_cache: Lazy[PersistentCache] = Lazy(lambda: PersistentCache(
+    path=os.getenv("GEOCODE_CACHE_PATH", data_path("geocode.sqlite3")),
+    ttl=float(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+    negative_ttl=float(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", "3600")),
+    max_memory=int(os.getenv("GEOCODE_CACHE_MEMORY_ENTRIES", "2048"))
+))
+
+
+def normalize_place(location: str) -> str:
+    """
+    Cache key for a free-text place name.
+
+    Lower-cases, collapses whitespace, tidies comma spacing and canonicalizes a
+    trailing country name. The country is kept rather than dropped so that
+    "Paris, Texas" and "Paris, France" stay distinct.
+    """
+    text = re.sub(r"\s+", " ", location.strip().lower())
+    parts = [part.strip() for part in text.split(",") if part.strip()]
+    if len(parts) > 1 and parts[-1] in COUNTRY_ALIASES:
+        parts[-1] = COUNTRY_ALIASES[parts[-1]]
+    return ", ".join(parts)
+
+
+def cached_geocode(location: str, resolver: Callable[[str], Optional[Dict[str, float]]]) -> Optional[Dict[str, float]]:
+    """
+    Coordinates for location as {"lat": ..., "lon": ...}, or None if it can't be found.
+
+    resolver is only called on a cache miss, and at most once at a time per
+    normalized place; misses are remembered for a shorter negative TTL.
+    """
+    return geocode_cache.get().get_or_compute(normalize_place(location), lambda: resolver(location))
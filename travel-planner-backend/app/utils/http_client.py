@@ -0,0 +1,155 @@
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import threading
+import logging
+import random
+import time
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+)
+DEFAULT_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+DEFAULT_BACKOFF = float(os.getenv("HTTP_BACKOFF_SECONDS", "0.5"))
+MAX_BACKOFF = 10.0
+
+
+class HttpClient:
+    """
+    Keep-alive HTTP client shared by every upstream API call.
+
+    One requests.Session holds a urllib3 connection pool per host, so repeated
+    calls to Amadeus, OpenCage or Overpass reuse open TCP/TLS connections.
+    Every request gets a (connect, read) timeout, and 429/5xx responses or
+    connection errors are retried up to `retries` times with full-jitter
+    exponential backoff, honouring Retry-After when the server sends one.
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 20,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        # Retries are handled here so they can back off with jitter
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._adapter = adapter
+        self._requests_by_host: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs: Any) -> requests.Response:
+        """Send a request through the shared pool, retrying transient failures."""
+        kwargs.setdefault("timeout", self.timeout)
+        retries = self.retries if retries is None else retries
+        host = urlsplit(url).netloc
+
+        attempt = 0
+        while True:
+            with self._lock:
+                self._requests_by_host[host] = self._requests_by_host.get(host, 0) + 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"{method} {host} failed ({str(e)}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                delay = self._retry_after(response) or self._backoff_delay(attempt)
+                logger.warning(f"{method} {host} returned {response.status_code}, retrying in {delay:.2f}s")
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-host connection pool usage for tuning pool sizes.
+
+        `in_use` and `idle` are current connection counts, `opened` is how many
+        connections the pool has created and `reuse_ratio` is the share of
+        requests that went out on an already open connection.
+        """
+        stats = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+            opened = pool.num_connections
+            served = pool.num_requests
+            stats[host] = {
+                "in_use": max(pool.maxsize - pool.pool.qsize(), 0) if pool.pool else 0,
+                "idle": idle,
+                "maxsize": pool.maxsize,
+                "opened": opened,
+                "requests": served,
+                "reuse_ratio": round(1 - opened / served, 3) if served else 0.0
+            }
+        with self._lock:
+            for host, count in self._requests_by_host.items():
+                stats.setdefault(host, {"requests": 0})["attempts"] = count
+        return stats
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return min(float(value), MAX_BACKOFF)
+        except ValueError:
+            return None
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Process-wide HttpClient, sized by HTTP_POOL_CONNECTIONS and HTTP_POOL_MAXSIZE."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient(
+                    pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+                    pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+                )
+    return _client
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return get_client().get(url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return get_client().post(url, **kwargs)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return get_client().pool_stats()
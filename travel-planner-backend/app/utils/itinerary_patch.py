@@ -0,0 +1,119 @@
+from typing import Any, Dict, List
+import copy
+import re
+
+# Days are stored as newline-separated lines under "Day N"; every other field
+# (Flights, Hotels) is a single string
+DAY_KEY = re.compile(r"^Day \d+$")
+OPS = ("add", "remove", "replace")
+MAX_OPS = 20
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _split_path(path: Any) -> List[str]:
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise PatchError(f"Invalid path: {path!r}")
+    parts = [part.replace("~1", "/").replace("~0", "~") for part in path[1:].split("/")]
+    if not 1 <= len(parts) <= 2 or not parts[0]:
+        raise PatchError(f"Path must name a field or a line within a day: {path!r}")
+    return parts
+
+
+def _line_index(token: str, length: int, op: str) -> int:
+    if token == "-" and op == "add":
+        return length
+    if not token.isdigit():
+        raise PatchError(f"Invalid line index: {token!r}")
+    index = int(token)
+    limit = length if op == "add" else length - 1
+    if index > limit:
+        raise PatchError(f"Line index {index} out of range")
+    return index
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, list) and all(isinstance(line, str) for line in value):
+        value = "\n".join(value)
+    if not isinstance(value, str) or not value.strip():
+        raise PatchError("Patch values must be non-empty strings")
+    return value.strip()
+
+
+def apply_patch(itinerary: Dict[str, Any], ops: Any) -> Dict[str, Any]:
+    """
+    Apply JSON-Patch-style edits to one itinerary option and return the result.
+
+    Supported ops are add, remove and replace. A path is either "/<field>"
+    for a whole field or "/Day N/<line>" for one line of a day, where <line> is
+    a zero-based index or "-" to append. Indexes refer to the day before the
+    patch, so ops don't need to account for each other. The patch is checked
+    in full against a copy, so a bad op leaves the original untouched and
+    raises PatchError. An empty patch means nothing needs to change and
+    returns the itinerary as it is.
+    """
+    if not isinstance(ops, list):
+        raise PatchError("Patch must be a list of ops")
+    if not ops:
+        return itinerary
+    if len(ops) > MAX_OPS:
+        raise PatchError(f"Patch has {len(ops)} ops; at most {MAX_OPS} are allowed")
+
+    patched = copy.deepcopy(itinerary)
+    # Lines of each day touched so far, tagged with their original index
+    days: Dict[str, List[List[Any]]] = {}
+    lengths: Dict[str, int] = {}
+    for op in ops:
+        if not isinstance(op, dict) or op.get("op") not in OPS:
+            raise PatchError(f"Unsupported op: {op!r}")
+        kind = op["op"]
+        parts = _split_path(op.get("path"))
+        field = parts[0]
+
+        if len(parts) == 1:
+            if kind == "add" and field in patched:
+                raise PatchError(f"{field} already exists")
+            if kind != "add" and field not in patched:
+                raise PatchError(f"No such field: {field}")
+            if kind == "add" and not DAY_KEY.match(field):
+                raise PatchError(f"Only days can be added, not {field!r}")
+            if field in days:
+                raise PatchError(f"{field} is edited both line by line and as a whole")
+            if kind == "remove":
+                del patched[field]
+            else:
+                patched[field] = _text(op.get("value"))
+            continue
+
+        if not DAY_KEY.match(field):
+            raise PatchError(f"Line edits are only allowed within a day, not {field!r}")
+        if field not in patched:
+            raise PatchError(f"No such day: {field}")
+        if field not in days:
+            lines = [line for line in str(patched[field]).split("\n") if line]
+            days[field] = [[i, line] for i, line in enumerate(lines)]
+            lengths[field] = len(lines)
+        entries = days[field]
+        index = _line_index(parts[1], lengths[field], kind)
+        # Line indexes refer to the day as the model saw it, so earlier ops in
+        # the same patch don't shift what later ones point at
+        position = next(
+            (p for p, entry in enumerate(entries) if entry[0] is not None and entry[0] >= index),
+            len(entries)
+        )
+        if kind == "add":
+            entries.insert(position, [None, _text(op.get("value"))])
+            continue
+        if position == len(entries) or entries[position][0] != index:
+            raise PatchError(f"Line {index} of {field} was already removed")
+        if kind == "replace":
+            entries[position][1] = _text(op.get("value"))
+        else:
+            del entries[position]
+
+    for field, entries in days.items():
+        if field in patched:
+            patched[field] = "\n".join(line for _, line in entries)
+    return patched
@@ -0,0 +1,170 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from collections import OrderedDict
+import threading
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the pool and its queue are saturated."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    status: str = QUEUED
+    result: Any = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.events[-1]["event"] if self.events else self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs long trip-planning pipelines on a bounded worker pool.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more wait for
+    a worker; anything beyond that is rejected with QueueFullError instead of
+    tying up another request thread. Finished jobs are kept for polling until
+    `max_retained` newer ones push them out.
+
+    Each job also keeps an ordered log of progress events (its status changes
+    plus whatever the job publishes) that listeners can follow as it grows.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, max_retained: int = 1000):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trip-job")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, job_id: Optional[str] = None, **kwargs: Any) -> Job:
+        """Queue `fn(*args, **kwargs)` and return its Job without waiting for it."""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Too many trips are being planned right now, try again shortly")
+
+        job = Job(job_id=job_id or uuid.uuid4().hex)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._record(job, QUEUED)
+            self._evict_finished()
+
+        try:
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            raise
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def publish(self, job_id: str, event: str, **data: Any) -> None:
+        """Append a progress event to a job's log and wake anyone following it."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._record(job, event, **data)
+
+    def follow(self, job_id: str, start: int = 0, heartbeat: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield a job's events from index `start` on, blocking for new ones.
+
+        None is yielded whenever `heartbeat` seconds pass without an event, so
+        a streaming caller can keep its connection alive. The iterator ends
+        after the job's done or failed event, or at once for an unknown job.
+        """
+        position = start
+        while True:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if position >= len(job.events):
+                    self._changed.wait(timeout=heartbeat)
+                pending = job.events[position:]
+            if not pending:
+                yield None
+                continue
+            for event in pending:
+                position += 1
+                yield event
+                if event["event"] in (DONE, FAILED):
+                    return
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        counts["max_workers"] = self.max_workers
+        counts["max_queue"] = self.max_queue
+        return counts
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> None:
+        job.started_at = time.time()
+        self._set_status(job, RUNNING)
+        try:
+            job.result = fn(*args, **kwargs)
+            job.finished_at = time.time()
+            self._set_status(job, DONE)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {str(e)}")
+            job.error = str(e)
+            job.finished_at = time.time()
+            self._set_status(job, FAILED, error=job.error)
+        finally:
+            self._slots.release()
+
+    def _set_status(self, job: Job, status: str, **data: Any) -> None:
+        with self._lock:
+            job.status = status
+            self._record(job, status, **data)
+
+    def _record(self, job: Job, event: str, **data: Any) -> None:
+        # Caller holds self._lock
+        job.events.append({"id": len(job.events), "event": event, "time": time.time(), **data})
+        self._changed.notify_all()
+
+    def _evict_finished(self) -> None:
+        # Oldest jobs sit at the front; only drop ones nobody is waiting on.
+        if len(self._jobs) <= self.max_retained:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_retained:
+                break
+            if self._jobs[job_id].status in (DONE, FAILED):
+                del self._jobs[job_id]
@@ -0,0 +1,39 @@
+from typing import Callable, Generic, Optional, TypeVar
+import threading
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    Value built by `factory` on first use, then shared.
+
+    Safe to call from many threads: the factory runs at most once unless it
+    raises, in which case the next call tries again. Module-level clients and
+    models go behind one of these so importing a module stays cheap and doesn't
+    need credentials until something actually uses them.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._factory()
+                    self._loaded = True
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def reset(self) -> None:
+        """Drop the value so the next get() builds a fresh one."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
@@ -0,0 +1,44 @@
+from typing import Any, Callable
+import hashlib
+import copy
+import re
+import os
+from app.utils.cache import PersistentCache
+from app.utils.lazy import Lazy
+from app.utils.storage import data_path
+
+llm_cache: Lazy[PersistentCache] = Lazy(lambda: PersistentCache(
+    path=os.getenv("LLM_CACHE_PATH", data_path("llm_cache.sqlite3")),
+    ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    max_memory=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+))
+
+
+def normalize_input(text: str) -> str:
+    """Case- and whitespace-insensitive form of free text, so "Paris  museums" == "paris museums"."""
+    return re.sub(r"\s+", " ", str(text).strip().lower())
+
+
+def prompt_key(model: str, prompt: str, user_input: str) -> str:
+    """
+    Content address for an LLM call.
+
+    Hashes the model name, the prompt template and the normalized input, so
+    editing a prompt or switching models naturally misses the old entries.
+    """
+    digest = hashlib.sha256()
+    for part in (model, prompt, normalize_input(user_input)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cached_llm_result(model: str, prompt: str, user_input: str, compute: Callable[[], Any]) -> Any:
+    """
+    Parsed result of an LLM call, computed at most once per content address.
+
+    compute() should return the parsed, JSON-serializable structure rather than
+    raw model text; failures raise and are not cached. Callers get their own
+    copy so mutating it can't corrupt the cache.
+    """
+    return copy.deepcopy(llm_cache.get().get_or_compute(prompt_key(model, prompt, user_input), compute))
@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional, Tuple
+import re
+
+DAYS = ["Mo", "Tu", "We", "Th", "Fr", "Sa", "Su"]
+
+# Weekday (0 = Monday) -> open (start, end) minutes; end may pass 1440 for places open past midnight
+Schedule = Dict[int, List[Tuple[int, int]]]
+
+_DAY_SPEC = r"[A-Z][a-z](?:-[A-Z][a-z])?"
+_TIME_SPEC = r"\d{1,2}:\d{2}-\d{1,2}:\d{2}\+?"
+_RULE = re.compile(
+    rf"(?:(?P<days>{_DAY_SPEC}(?:,{_DAY_SPEC})*)\s+)?(?P<times>off|closed|{_TIME_SPEC}(?:,\s*{_TIME_SPEC})*)"
+)
+
+
+def _minutes(clock: str) -> int:
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _days(spec: Optional[str]) -> List[int]:
+    if not spec:
+        return list(range(7))
+    days = []
+    for part in spec.split(","):
+        first, _, last = part.partition("-")
+        start = DAYS.index(first)
+        end = DAYS.index(last) if last else start
+        # Ranges like Fr-Mo wrap past Sunday
+        days.extend((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    return days
+
+
+def parse_opening_hours(text: Optional[str]) -> Optional[Schedule]:
+    """
+    Weekly schedule from the common subset of OSM opening_hours syntax.
+
+    Handles "24/7" and ";"-separated rules such as "Mo-Fr 09:00-18:00",
+    "Sa,Su 10:00-14:00,17:00-23:00" or "Su off", where later rules replace
+    earlier ones for the days they name. Returns None for anything else
+    (holidays, months, comments), meaning the hours are unknown.
+    """
+    if not text:
+        return None
+    text = text.strip()
+    if text == "24/7":
+        return {day: [(0, 1440)] for day in range(7)}
+    schedule: Schedule = {}
+    for rule in filter(None, (part.strip() for part in text.split(";"))):
+        match = _RULE.fullmatch(rule)
+        if not match:
+            return None
+        try:
+            days = _days(match.group("days"))
+        except ValueError:
+            return None
+        ranges = []
+        if match.group("times") not in ("off", "closed"):
+            for span in match.group("times").split(","):
+                start, end = (_minutes(clock) for clock in span.strip().rstrip("+").split("-"))
+                ranges.append((start, end if end > start else end + 1440))
+        for day in days:
+            schedule[day] = ranges
+    return schedule
+
+
+def is_open(schedule: Optional[Schedule], weekday: int, start: int, end: int) -> bool:
+    """Whether the place is open from start to end minutes on weekday; unknown hours count as open."""
+    if schedule is None:
+        return True
+    return any(opens <= start and end <= closes for opens, closes in schedule.get(weekday, []))
@@ -0,0 +1,207 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from math import floor, radians, cos
+import logging
+import json
+import time
+import zlib
+import os
+from app.utils.geo import within_radius
+from app.utils.lazy import Lazy
+from app.utils.storage import SQLiteDB, data_path
+
+logger = logging.getLogger(__name__)
+
+Tile = Tuple[int, int]
+BBox = Tuple[float, float, float, float]  # south, west, north, east
+
+
+
+def tag_key(tag: Sequence[str]) -> str:
+    return f"{tag[0]}={tag[1]}"
+
+
+class OverpassTileCache:
+    """
+    Spatial cache of parsed Overpass places, keyed by (grid tile, tag).
+
+    The world is cut into fixed `tile_degrees` squares. A radius query is
+    answered from every tile its bounding box touches: tiles already cached for
+    a tag are read from disk, and only the missing (tile, tag) pairs are sent to
+    Overpass. Each entry is a zlib-compressed JSON list of compact place records
+    in SQLite, so the cache survives restarts, and entries are decoded one at a
+    time as a request's results are consumed. A fill cut short by a result cap
+    is an arbitrary subset of its tiles, so it is discarded and each half of
+    the tiles fetched again under its own cap, down to single tiles; a single
+    tile that is still capped is used for the request but not stored.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, tile_degrees: float = 0.05):
+        self.ttl = ttl
+        self.tile_degrees = tile_degrees
+        self.db = SQLiteDB(path, schema=[
+            "CREATE TABLE IF NOT EXISTS tiles ("
+            "tile TEXT NOT NULL, tag TEXT NOT NULL, fetched_at REAL NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (tile, tag))"
+        ])
+
+    def tile_for(self, lat: float, lon: float) -> Tile:
+        return floor(lat / self.tile_degrees), floor(lon / self.tile_degrees)
+
+    def tile_bbox(self, tile: Tile) -> BBox:
+        south = tile[0] * self.tile_degrees
+        west = tile[1] * self.tile_degrees
+        return south, west, south + self.tile_degrees, west + self.tile_degrees
+
+    def tiles_covering(self, lat: float, lon: float, radius: float) -> List[Tile]:
+        """Tiles touched by the bounding box of a radius-metre circle around (lat, lon)."""
+        dlat = radius / 111320.0
+        dlon = radius / (111320.0 * max(cos(radians(lat)), 1e-6))
+        south, west = self.tile_for(lat - dlat, lon - dlon)
+        north, east = self.tile_for(lat + dlat, lon + dlon)
+        return [(i, j) for i in range(south, north + 1) for j in range(west, east + 1)]
+
+    def fetch(self, lat: float, lon: float, radius: float, tags: Iterable[Sequence[str]],
+              fetch_missing: Callable[[BBox, List[Sequence[str]]], Tuple[List[Dict[str, Any]], bool]]) -> List[Dict[str, Any]]:
+        """
+        Places within radius metres of (lat, lon) carrying any of tags.
+
+        fetch_missing(bbox, tags) is called for whatever the cache can't answer
+        and must return compact records ({"osm_type", "osm_id", "lat", "lon",
+        "tags"}) and whether they are every match in bbox; incomplete results
+        are not cached.
+        """
+        return list(self.iter_fetch(lat, lon, radius, tags, fetch_missing))
+
+    def iter_fetch(self, lat: float, lon: float, radius: float, tags: Iterable[Sequence[str]],
+                   fetch_missing: Callable[[BBox, List[Sequence[str]]], Tuple[List[Dict[str, Any]], bool]]) -> Iterator[Dict[str, Any]]:
+        """
+        The places of fetch, yielded one cache entry at a time.
+
+        Memory holds the entry being read plus the ids already yielded. The
+        one exception is a fill from Overpass, which is held whole because it
+        has to be split into tiles and stored.
+        """
+        tags = list({tag_key(tag): tag for tag in tags}.values())
+        tiles = self.tiles_covering(lat, lon, radius)
+        cached, missing = self._load(tiles, tags)
+        seen = set()
+
+        def inside(records: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            # Tiles overhang the circle, so drop what lies outside it
+            records = [record for record in records if (record["osm_type"], record["osm_id"]) not in seen]
+            for i in within_radius(lat, lon, [record["lat"] for record in records],
+                                   [record["lon"] for record in records], radius / 1000):
+                seen.add((records[i]["osm_type"], records[i]["osm_id"]))
+                yield records[i]
+
+        for entry in cached:
+            records = self._read(entry)
+            if records is not None:
+                yield from inside(records)
+
+        # Tiles missing the same tags are fetched together with one bounding box
+        groups: Dict[Tuple[str, ...], List[Tile]] = {}
+        for tile, missing_tags in missing.items():
+            groups.setdefault(tuple(sorted(missing_tags)), []).append(tile)
+
+        by_tag = {tag_key(tag): tag for tag in tags}
+        work = [([by_tag[key] for key in missing_keys], group_tiles) for missing_keys, group_tiles in groups.items()]
+        work.reverse()
+        while work:
+            group_tags, group_tiles = work.pop()
+            records, complete = fetch_missing(self._envelope(group_tiles), group_tags)
+            if not complete and len(group_tiles) > 1:
+                logger.info(f"Overpass hit its result cap for {len(group_tiles)} tiles; fetching them in halves")
+                first, second = self._halves(group_tiles)
+                work.extend([(group_tags, second), (group_tags, first)])
+                continue
+            fresh = self._split(records, set(group_tiles), group_tags)
+            if complete:
+                self._store(fresh)
+            else:
+                logger.info(f"Overpass hit its result cap for tile {self._tile_name(group_tiles[0])}; not caching it")
+            for records in fresh.values():
+                yield from inside(records)
+
+    def _load(self, tiles: List[Tile], tags: List[Sequence[str]]) -> Tuple[List[Tuple[str, str]], Dict[Tile, List[str]]]:
+        """(tile name, tag) keys of the fresh cached entries, and the tags each tile is missing."""
+        wanted = {tag_key(tag) for tag in tags}
+        found: Dict[Tile, set] = {tile: set() for tile in tiles}
+        cached = []
+        conn = self.db.connection()
+        now = time.time()
+        tile_names = {self._tile_name(tile): tile for tile in tiles}
+        for chunk in _chunks(list(tile_names), 200):
+            rows = conn.execute(
+                f"SELECT tile, tag FROM tiles WHERE fetched_at > ? AND tile IN ({','.join('?' * len(chunk))})",
+                (now - self.ttl, *chunk)
+            ).fetchall()
+            for name, tag in rows:
+                if tag not in wanted:
+                    continue
+                found[tile_names[name]].add(tag)
+                cached.append((name, tag))
+        missing = {tile: sorted(wanted - have) for tile, have in found.items() if wanted - have}
+        return cached, missing
+
+    def _read(self, entry: Tuple[str, str]) -> Optional[List[Dict[str, Any]]]:
+        row = self.db.connection().execute("SELECT data FROM tiles WHERE tile = ? AND tag = ?", entry).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def _split(self, records: List[Dict[str, Any]], tiles: set, tags: List[Sequence[str]]) -> Dict[Tuple[Tile, str], List[Dict[str, Any]]]:
+        # Every (tile, tag) we asked for gets an entry, even an empty one, so it isn't refetched
+        entries = {(tile, tag_key(tag)): [] for tile in tiles for tag in tags}
+        for record in records:
+            tile = self.tile_for(record["lat"], record["lon"])
+            if tile not in tiles:
+                # Belongs to a tile we didn't fetch; it will be stored when that tile is
+                continue
+            element_tags = dict(record["tags"])
+            for tag in tags:
+                if element_tags.get(tag[0]) == tag[1]:
+                    entries[(tile, tag_key(tag))].append(record)
+        return entries
+
+    def _store(self, entries: Dict[Tuple[Tile, str], List[Dict[str, Any]]]) -> None:
+        now = time.time()
+        rows = [
+            (self._tile_name(tile), tag, now, zlib.compress(json.dumps(records, separators=(",", ":")).encode("utf-8")))
+            for (tile, tag), records in entries.items()
+        ]
+        with self.db.connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO tiles (tile, tag, fetched_at, data) VALUES (?, ?, ?, ?)", rows)
+
+    def _envelope(self, tiles: List[Tile]) -> BBox:
+        south = min(tile[0] for tile in tiles) * self.tile_degrees
+        west = min(tile[1] for tile in tiles) * self.tile_degrees
+        north = (max(tile[0] for tile in tiles) + 1) * self.tile_degrees
+        east = (max(tile[1] for tile in tiles) + 1) * self.tile_degrees
+        return south, west, north, east
+
+    @staticmethod
+    def _halves(tiles: List[Tile]) -> Tuple[List[Tile], List[Tile]]:
+        """Split tiles in two across whichever axis they span more rows or columns of."""
+        axis = 0 if len({tile[0] for tile in tiles}) >= len({tile[1] for tile in tiles}) else 1
+        ordered = sorted(tiles, key=lambda tile: (tile[axis], tile[1 - axis]))
+        middle = len(ordered) // 2
+        return ordered[:middle], ordered[middle:]
+
+    @staticmethod
+    def _tile_name(tile: Tile) -> str:
+        return f"{tile[0]}:{tile[1]}"
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+_cache: Lazy[OverpassTileCache] = Lazy(lambda: OverpassTileCache(
+    path=os.getenv("OVERPASS_CACHE_PATH", data_path("overpass_tiles.sqlite3")),
+    ttl=float(os.getenv("OVERPASS_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    tile_degrees=float(os.getenv("OVERPASS_TILE_DEGREES", "0.05"))
+))
+
+
+def get_cache() -> OverpassTileCache:
+    return _cache.get()
@@ -0,0 +1,131 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set
+import codecs
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DELIMITERS = frozenset(",:]} \t\n\r")
+
+
+class _Stream:
+    """Text buffer over an iterable of byte chunks that only keeps the unparsed tail."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            if chunk:
+                # Drop what's been consumed so memory stays at roughly one chunk
+                self.buf = self.buf[self.pos:] + self._decoder.decode(chunk)
+                self.pos = 0
+                return True
+        self.buf = self.buf[self.pos:] + self._decoder.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or "" at end of input."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof or not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed Overpass JSON: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buf, self.pos)
+                # A number cut by a chunk boundary ("0." or "12") still decodes, so only
+                # trust the value once a delimiter follows it
+                if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_elements(chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the objects of an Overpass JSON response's "elements" array one at a time.
+
+    Only the element being decoded and the current chunk are held in memory,
+    never the whole document. Other top-level fields are decoded and discarded,
+    except "remark", which Overpass uses to report timeouts and is logged.
+    """
+    stream = _Stream(chunks)
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key == "elements":
+            stream.expect("[")
+            while stream.peek() != "]":
+                yield stream.value()
+                if stream.peek() == ",":
+                    stream.pos += 1
+            stream.pos += 1
+        else:
+            value = stream.value()
+            if key == "remark":
+                logger.warning(f"Overpass remark: {value}")
+        if stream.peek() == ",":
+            stream.pos += 1
+        elif stream.peek() == "":
+            raise ValueError("Malformed Overpass JSON: unexpected end of response")
+
+
+def iter_place_records(chunks: Iterable[bytes], keep_tags: Optional[Set[str]] = None,
+                       on_element: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream compact place records from an Overpass response.
+
+    Nodes use their own coordinates and ways the center Overpass computes;
+    elements without a position are skipped. If keep_tags is given, only
+    those tag keys are kept. on_element, if given, sees every raw element
+    first, including relations, duplicates and others that are skipped.
+    """
+    seen = set()
+    for element in iter_elements(chunks):
+        if on_element is not None:
+            on_element(element)
+        osm_type = element.get("type")
+        if osm_type == "node":
+            lat, lon = element.get("lat"), element.get("lon")
+        elif osm_type == "way":
+            center = element.get("center") or {}
+            lat, lon = center.get("lat"), center.get("lon")
+        else:
+            continue
+        if lat is None or lon is None or (osm_type, element.get("id")) in seen:
+            continue
+        seen.add((osm_type, element.get("id")))
+
+        tags = element.get("tags", {})
+        yield {
+            "osm_type": osm_type,
+            "osm_id": element.get("id"),
+            "lat": float(lat),
+            "lon": float(lon),
+            "tags": [(k, v) for k, v in tags.items() if keep_tags is None or k in keep_tags]
+        }
@@ -0,0 +1,51 @@
+from typing import List, Sequence
+import numpy as np
+
+
+def nearest_neighbour(dist: np.ndarray, start: int, stops: Sequence[int]) -> List[int]:
+    """Visit order for stops that always goes to the closest one not yet visited."""
+    remaining = list(stops)
+    order = []
+    current = start
+    while remaining:
+        current = remaining.pop(int(np.argmin(dist[current, remaining])))
+        order.append(current)
+    return order
+
+
+def two_opt(dist: np.ndarray, start: int, order: Sequence[int], max_passes: int = 50) -> List[int]:
+    """
+    Shorten a round trip from start through order by reversing segments.
+
+    Each pass tries, for every position, all segment ends at once with one
+    vectorized lookup into dist, and applies the best improving reversal.
+    Stops after a pass with no improvement (a 2-opt local optimum) or after
+    max_passes.
+    """
+    route = np.array([start, *order, start])
+    last = len(route) - 1
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, last - 1):
+            ends = np.arange(i + 1, last)
+            before, first = route[i - 1], route[i]
+            delta = (dist[before, route[ends]] + dist[first, route[ends + 1]]
+                     - dist[before, first] - dist[route[ends], route[ends + 1]])
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                end = ends[best]
+                route[i:end + 1] = route[i:end + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return route[1:-1].tolist()
+
+
+def plan_route(dist: np.ndarray, start: int, stops: Sequence[int]) -> List[int]:
+    """Short round trip from start through stops: nearest neighbour, then 2-opt."""
+    return two_opt(dist, start, nearest_neighbour(dist, start, stops))
+
+
+def route_length(dist: np.ndarray, start: int, order: Sequence[int]) -> float:
+    route = [start, *order, start]
+    return float(sum(dist[a, b] for a, b in zip(route, route[1:])))
@@ -0,0 +1,84 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+import heapq
+import math
+from app.utils.geo import EARTH_RADIUS_KM
+
+
+class KDTree:
+    """
+    Static 2-d tree over points, for k-nearest queries with a filter.
+
+    Points are projected once onto a local flat plane in km (equirectangular
+    around their mean latitude), which ranks neighbours the same as haversine
+    at city scale. A query descends to the query point's cell and only
+    backtracks into subtrees that could still hold something closer, so it
+    touches O(log n) nodes when few points are rejected by the filter.
+    """
+
+    def __init__(self, lats: Sequence[float], lons: Sequence[float]):
+        self._lat0 = sum(lats) / len(lats) if len(lats) else 0.0
+        self._scale = math.cos(math.radians(self._lat0))
+        self._coords = [self._project(lat, lon) for lat, lon in zip(lats, lons)]
+        # Node i holds point _points[i], split on _axes[i]; children are node ids or -1
+        self._points: List[int] = []
+        self._axes: List[int] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._root = self._build(list(range(len(self._coords))))
+
+    def __len__(self) -> int:
+        return len(self._coords)
+
+    def _project(self, lat: float, lon: float) -> Tuple[float, float]:
+        return math.radians(lon) * self._scale * EARTH_RADIUS_KM, math.radians(lat) * EARTH_RADIUS_KM
+
+    def _build(self, indexes: List[int]) -> int:
+        if not indexes:
+            return -1
+        # Split on whichever axis the points spread further along
+        xs = [self._coords[i][0] for i in indexes]
+        ys = [self._coords[i][1] for i in indexes]
+        axis = 0 if max(xs) - min(xs) >= max(ys) - min(ys) else 1
+        indexes.sort(key=lambda i: self._coords[i][axis])
+        middle = len(indexes) // 2
+
+        node = len(self._points)
+        self._points.append(indexes[middle])
+        self._axes.append(axis)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._left[node] = self._build(indexes[:middle])
+        self._right[node] = self._build(indexes[middle + 1:])
+        return node
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                accept: Optional[Callable[[int], bool]] = None) -> List[Tuple[float, int]]:
+        """
+        Up to k (distance_km, index) pairs closest to (lat, lon), nearest first.
+
+        Points for which accept(index) is false are skipped, e.g. ones already
+        used or closed at the time in question.
+        """
+        query = self._project(lat, lon)
+        best: List[Tuple[float, int]] = []  # max-heap of (-squared distance, index)
+
+        def visit(node: int) -> None:
+            if node == -1:
+                return
+            index = self._points[node]
+            point = self._coords[index]
+            if accept is None or accept(index):
+                d2 = (point[0] - query[0]) ** 2 + (point[1] - query[1]) ** 2
+                if len(best) < k:
+                    heapq.heappush(best, (-d2, index))
+                elif d2 < -best[0][0]:
+                    heapq.heapreplace(best, (-d2, index))
+            diff = query[self._axes[node]] - point[self._axes[node]]
+            near, far = (self._left[node], self._right[node]) if diff < 0 else (self._right[node], self._left[node])
+            visit(near)
+            if len(best) < k or diff * diff < -best[0][0]:
+                visit(far)
+
+        if k > 0:
+            visit(self._root)
+        return sorted((math.sqrt(-d2), index) for d2, index in best)
@@ -0,0 +1,43 @@
+from typing import Iterable
+import threading
+import sqlite3
+import os
+
+# Local state (trip results, caches) lives here unless a module's own *_PATH variable says otherwise
+DATA_DIR = os.getenv(
+    "TRAVELBUDDY_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data")
+)
+
+
+def data_path(filename: str) -> str:
+    return os.path.join(DATA_DIR, filename)
+
+
+class SQLiteDB:
+    """
+    Per-thread sqlite3 connections to one database file.
+
+    sqlite3 connections can't be shared between threads, so each thread lazily
+    opens its own. WAL mode lets readers in other threads and worker processes
+    proceed while one of them writes.
+    """
+
+    def __init__(self, path: str, schema: Iterable[str] = ()):
+        self.path = path
+        self._local = threading.local()
+        with self.connection() as conn:
+            for statement in schema:
+                conn.execute(statement)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,110 @@
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+import sqlite3
+import json
+import time
+from app.utils.storage import SQLiteDB
+
+
+class TripStore:
+    """
+    Trip results keyed by trip id, persisted in SQLite.
+
+    SQLite keeps results across restarts and lets every gunicorn worker on the
+    host see the same trips. Rows older than `ttl` seconds are treated as gone and
+    the table is pruned to the `max_entries` most recently used trips. In front of
+    it sits a small per-process LRU of decoded results; a hit costs one primary-key
+    lookup of the row's version instead of reading and decoding the JSON blob.
+    Reads, cached or not, refresh the row's accessed_at at most once every
+    `touch_interval` seconds, so pruning keeps the most used trips.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000, ttl: float = 7 * 24 * 3600, cache_size: int = 128,
+                 touch_interval: float = 60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.touch_interval = touch_interval
+        self._cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = SQLiteDB(path, schema=[
+            "CREATE TABLE IF NOT EXISTS trips ("
+            "trip_id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS trips_accessed_at ON trips (accessed_at)"
+        ])
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    def put(self, trip_id: str, data: Any) -> None:
+        """Store (or replace) the result for trip_id."""
+        now = time.time()
+        payload = json.dumps(data)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO trips (trip_id, data, created_at, updated_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(trip_id) DO UPDATE SET data = excluded.data, "
+                "updated_at = excluded.updated_at, accessed_at = excluded.accessed_at",
+                (trip_id, payload, now, now, now)
+            )
+            self._prune(conn, now)
+        self._remember(trip_id, now, data)
+
+    def get(self, trip_id: str) -> Optional[Any]:
+        """Return the stored result for trip_id, or None if it is unknown or expired."""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT updated_at, created_at, accessed_at FROM trips WHERE trip_id = ?", (trip_id,)
+        ).fetchone()
+        if row is None:
+            self._forget(trip_id)
+            return None
+
+        updated_at, created_at, accessed_at = row
+        now = time.time()
+        if now - created_at > self.ttl:
+            self.delete(trip_id)
+            return None
+        if now - accessed_at >= self.touch_interval:
+            with conn:
+                conn.execute("UPDATE trips SET accessed_at = ? WHERE trip_id = ?", (now, trip_id))
+
+        with self._lock:
+            cached = self._cache.get(trip_id)
+            if cached is not None and cached[0] == updated_at:
+                self._cache.move_to_end(trip_id)
+                return cached[1]
+
+        row = conn.execute("SELECT data FROM trips WHERE trip_id = ?", (trip_id,)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        self._remember(trip_id, updated_at, data)
+        return data
+
+    def delete(self, trip_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM trips WHERE trip_id = ?", (trip_id,))
+        self._forget(trip_id)
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM trips WHERE created_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM trips WHERE trip_id NOT IN "
+            "(SELECT trip_id FROM trips ORDER BY accessed_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def _remember(self, trip_id: str, version: float, data: Any) -> None:
+        with self._lock:
+            self._cache[trip_id] = (version, data)
+            self._cache.move_to_end(trip_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, trip_id: str) -> None:
+        with self._lock:
+            self._cache.pop(trip_id, None)
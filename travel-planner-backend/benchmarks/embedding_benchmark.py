@@ -0,0 +1,95 @@
+"""
+Ranking cost of the vectorized embedding API versus the old per-pair helpers.
+
+    python -m benchmarks.embedding_benchmark [--sizes 100 1000 10000] [--k 10] [--texts 500]
+
+Similarity is measured on random unit vectors, so it doesn't depend on the
+model. The old path is reproduced as it was: Python-list embeddings, one
+cosine_similarity call per candidate, then a full sort. Encoding compares one
+model.encode call per text against a single batched call; pass --texts 0 to
+skip it.
+"""
+from typing import List
+import argparse
+import random
+import math
+import tempfile
+import time
+import numpy as np
+from app.utils import embeddings
+from app.utils.embedding_store import EmbeddingStore
+from app.utils.lazy import Lazy
+
+DIM = 384
+
+
+def legacy_cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
+    dot_product = sum(a * b for a, b in zip(vec1, vec2))
+    norm1 = math.sqrt(sum(a * a for a in vec1))
+    norm2 = math.sqrt(sum(b * b for b in vec2))
+    return dot_product / (norm1 * norm2 + 1e-10)
+
+
+def legacy_top_k(query: List[float], candidates: List[List[float]], k: int) -> List[int]:
+    scored = [(legacy_cosine_similarity(query, vector), i) for i, vector in enumerate(candidates)]
+    scored.sort(reverse=True)
+    return [i for _, i in scored[:k]]
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def bench_similarity(sizes: List[int], k: int) -> None:
+    rng = np.random.default_rng(42)
+    print(f"{'candidates':>10} {'per-pair':>12} {'vectorized':>12} {'speedup':>9}  top-{k} agree")
+    for size in sizes:
+        matrix = embeddings.normalize_rows(rng.standard_normal((size, DIM)))
+        query = embeddings.normalize_rows(rng.standard_normal(DIM))
+        matrix_lists = matrix.tolist()
+        query_list = query.tolist()
+
+        legacy = best_of(lambda: legacy_top_k(query_list, matrix_lists, k), repeat=1 if size > 5000 else 3)
+        vectorized = best_of(lambda: embeddings.top_k(query, matrix, k))
+        agree = legacy_top_k(query_list, matrix_lists, k) == embeddings.top_k(query, matrix, k)[0].tolist()
+        print(f"{size:>10} {legacy * 1000:>10.2f}ms {vectorized * 1000:>10.3f}ms {legacy / vectorized:>8.0f}x  {agree}")
+
+
+def bench_encode(count: int) -> None:
+    rng = random.Random(42)
+    words = ["Musée", "Café", "Park", "Gallery", "Tower", "Garden", "Bistro", "Market", "Cathedral", "Bridge"]
+    texts = [f"{rng.choice(words)} {rng.choice(words)} {i}" for i in range(count)]
+
+    started = time.perf_counter()
+    for text in texts:
+        embeddings.model.get().encode(text).tolist()
+    one_by_one = time.perf_counter() - started
+
+    # A throwaway store, so every text really is encoded
+    dim = embeddings.model.get().get_sentence_embedding_dimension()
+    embeddings.store = Lazy(lambda: EmbeddingStore(tempfile.mkdtemp(), dim, embeddings.MODEL_NAME))
+    started = time.perf_counter()
+    embeddings.encode(texts)
+    batched = time.perf_counter() - started
+    print(f"encode {count} texts: one at a time {one_by_one:.2f}s, batched {batched:.2f}s ({one_by_one / batched:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="candidate counts to rank")
+    parser.add_argument("--k", type=int, default=10, help="results to keep")
+    parser.add_argument("--texts", type=int, default=500, help="texts to encode; 0 skips the encoding comparison")
+    args = parser.parse_args()
+
+    bench_similarity(args.sizes, args.k)
+    if args.texts:
+        bench_encode(args.texts)
+
+
+if __name__ == "__main__":
+    main()
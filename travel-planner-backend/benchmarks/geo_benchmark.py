@@ -0,0 +1,81 @@
+"""
+Vectorized distances in app.utils.geo versus the scalar haversine.
+
+    python -m benchmarks.geo_benchmark [--points 10000] [--block 1000] [--scalar-rows 100]
+
+Computes all points x points distances (10k x 10k = 100M pairs by default)
+in row blocks of --block, so memory stays at block * points float64s, and
+keeps each row's nearest neighbour so the work can't be skipped. The scalar
+version calls haversine_km once per pair; it is timed on --scalar-rows rows
+and extrapolated, since the full run would take minutes. Also compares the
+equirectangular approximation's speed and error, and a radius query with and
+without the bounding-box prefilter.
+"""
+import argparse
+import time
+import numpy as np
+from app.utils import geo
+
+CENTER = (48.8566, 2.3522)
+
+
+def all_pairs_nearest(distance_fn, lats: np.ndarray, lons: np.ndarray, block: int) -> np.ndarray:
+    nearest = np.empty(len(lats))
+    for start in range(0, len(lats), block):
+        rows = slice(start, start + block)
+        distances = distance_fn(lats[rows], lons[rows], lats, lons)
+        # Ignore each point's distance to itself
+        distances[np.arange(distances.shape[0]), np.arange(start, start + distances.shape[0])] = np.inf
+        nearest[rows] = distances.min(axis=1)
+    return nearest
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=10000, help="points in the all-pairs comparison")
+    parser.add_argument("--block", type=int, default=1000, help="rows per vectorized block")
+    parser.add_argument("--scalar-rows", type=int, default=100, help="rows to time the scalar version on")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    # A ~60 km square around the city centre
+    lats = CENTER[0] + rng.uniform(-0.27, 0.27, args.points)
+    lons = CENTER[1] + rng.uniform(-0.4, 0.4, args.points)
+    lat_list, lon_list = lats.tolist(), lons.tolist()
+    pairs = args.points ** 2
+
+    scalar, _ = timed(lambda: [
+        [geo.haversine_km(lat_list[i], lon_list[i], lat, lon) for lat, lon in zip(lat_list, lon_list)]
+        for i in range(args.scalar_rows)
+    ])
+    scalar *= args.points / args.scalar_rows
+    vectorized, exact = timed(lambda: all_pairs_nearest(geo.haversine_many, lats, lons, args.block))
+    approximate, approx = timed(lambda: all_pairs_nearest(geo.equirectangular_many, lats, lons, args.block))
+    error = np.abs(approx - exact) / exact
+
+    print(f"{args.points} x {args.points} distances ({pairs / 1e6:.0f}M pairs)")
+    print(f"  {'scalar haversine':>24}: {scalar:8.2f}s  (extrapolated from {args.scalar_rows} rows)")
+    print(f"  {'vectorized haversine':>24}: {vectorized:8.2f}s  {scalar / vectorized:6.0f}x")
+    print(f"  {'vectorized equirectangular':>24}: {approximate:8.2f}s  {scalar / approximate:6.0f}x"
+          f"  max relative error {error.max():.1e}")
+
+    radius_km = 2.0
+    loop, slow = timed(lambda: [
+        i for i, (lat, lon) in enumerate(zip(lat_list, lon_list)) if geo.haversine_km(*CENTER, lat, lon) <= radius_km
+    ])
+    full, _ = timed(lambda: np.flatnonzero(geo.haversine_one_to_many(*CENTER, lats, lons) <= radius_km))
+    boxed, fast = timed(lambda: geo.within_radius(*CENTER, lats, lons, radius_km))
+    print(f"points within {radius_km:g} km of the centre ({len(fast)} of {args.points}, same: {slow == fast.tolist()})")
+    print(f"  {'scalar loop':>24}: {loop * 1000:8.2f}ms")
+    print(f"  {'one-to-many haversine':>24}: {full * 1000:8.2f}ms")
+    print(f"  {'bbox prefilter + haversine':>24}: {boxed * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
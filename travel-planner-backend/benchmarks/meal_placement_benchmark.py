@@ -0,0 +1,98 @@
+"""
+Nearest-restaurant lookups: the per-trip KDTree versus a linear scan.
+
+    python -m benchmarks.meal_placement_benchmark [--sizes 200 2000 10000] [--queries 1000]
+
+Restaurants are scattered over a ~10 km square. Each query asks for the
+nearest restaurant not used yet, and uses it, the way _schedule_meals places
+meals; the scan computes the distance to every unused restaurant. Both must
+pick the same restaurants. Also times a full _schedule_meals run for a week
+with 200 restaurants and a routed set of activities.
+"""
+from datetime import datetime
+import argparse
+import random
+import time
+from app.agents.itinerary_agent import ItineraryAgent
+from app.agents.poi_agent import POI, POITable
+from app.utils import geo
+from app.utils.spatial_index import KDTree
+
+HOTEL = (48.8647, 2.2938)
+
+
+def random_points(count: int, rng: random.Random):
+    return ([HOTEL[0] + rng.uniform(-0.045, 0.045) for _ in range(count)],
+            [HOTEL[1] + rng.uniform(-0.07, 0.07) for _ in range(count)])
+
+
+def with_index(lats, lons, queries):
+    started = time.perf_counter()
+    index = KDTree(lats, lons)
+    built = time.perf_counter() - started
+    used = set()
+    picks = []
+    for lat, lon in queries:
+        found = index.nearest(lat, lon, accept=lambda i: i not in used)
+        picks.append(found[0][1])
+        used.add(found[0][1])
+    return built, picks
+
+
+def with_scan(lats, lons, queries):
+    used = set()
+    picks = []
+    for lat, lon in queries:
+        best = min((i for i in range(len(lats)) if i not in used),
+                   key=lambda i: geo.haversine_km(lat, lon, lats[i], lons[i]))
+        picks.append(best)
+        used.add(best)
+    return picks
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def bench_schedule(rng: random.Random) -> None:
+    def pois(count, kind):
+        lats, lons = random_points(count, rng)
+        return [POI(name=f"{kind} {i}", description="", location=(lat, lon), type="amenity",
+                    tags=[("amenity", kind)], osm_id=i, osm_type="node", relevance_score=rng.random())
+                for i, (lat, lon) in enumerate(zip(lats, lons))]
+
+    agent = ItineraryAgent()
+    table = POITable(pois(40, "museum"))
+    food_rows = table.extend(pois(200, "restaurant"))
+    days = 7
+    booked = [[] for _ in range(days)]
+    activities = agent._schedule_activities(table, range(food_rows.start), HOTEL, days, [["amenity", "museum"]], booked)
+    elapsed, meals = timed(lambda: agent._schedule_meals(table, food_rows, HOTEL, days, booked, activities, datetime(2025, 5, 26)))
+    distances = [meal["distance_from_last"] for day in meals for meal in day]
+    print(f"_schedule_meals, 200 restaurants, {days} days: {elapsed * 1000:.1f}ms, "
+          f"{len(distances)} meals, mean {sum(distances) / len(distances):.2f} km from the previous stop")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 10000], help="restaurant counts")
+    parser.add_argument("--queries", type=int, default=1000, help="meals to place (capped at the restaurant count)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'restaurants':>11} {'queries':>8} {'scan':>10} {'KDTree':>10} {'(build)':>9} {'speedup':>8}  same")
+    for size in args.sizes:
+        lats, lons = random_points(size, rng)
+        queries = list(zip(*random_points(min(args.queries, size), rng)))
+        scan, scanned = timed(lambda: with_scan(lats, lons, queries))
+        indexed, (built, picked) = timed(lambda: with_index(lats, lons, queries))
+        print(f"{size:>11} {len(queries):>8} {scan * 1000:>8.1f}ms {indexed * 1000:>8.1f}ms {built * 1000:>7.1f}ms"
+              f" {scan / indexed:>7.0f}x  {scanned == picked}")
+
+    bench_schedule(rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Memory and latency of the streaming Overpass parser versus the overpy path.
+
+Uses the largest recorded fixture from overpass_query_benchmark if there is
+one, otherwise synthesizes a dense-city sized response:
+
+    python -m benchmarks.overpass_parse_benchmark [--elements 200000] [--fixture path.json]
+
+The overpy side reproduces the old fetch_osm_places: Overpass().parse_json on
+the whole body, then a dict per node and way with list(tags.items()).
+"""
+from typing import Callable, Iterator
+import argparse
+import tracemalloc
+import random
+import json
+import time
+import glob
+import os
+from app.utils.overpass_stream import iter_place_records
+from app.utils.api_wrappers import PLACE_TAGS
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "overpass")
+CHUNK_SIZE = 64 * 1024
+
+
+def synthesize(elements: int) -> bytes:
+    rng = random.Random(42)
+    items = []
+    for i in range(elements):
+        tags = {
+            "name": f"Place {i}",
+            "amenity": rng.choice(["restaurant", "cafe", "bar", "pub"]),
+            "cuisine": rng.choice(["french", "italian", "local", "japanese"]),
+            "opening_hours": "Mo-Su 09:00-22:00",
+            "addr:street": "Rue de Rivoli",
+            "addr:housenumber": str(i % 300),
+            "addr:postcode": "75001",
+            "wheelchair": "yes",
+            "check_date": "2024-05-01",
+        }
+        if i % 3:
+            items.append({"type": "node", "id": i, "lat": 48.8 + rng.random() / 10, "lon": 2.3 + rng.random() / 10, "tags": tags})
+        else:
+            items.append({
+                "type": "way", "id": i,
+                "center": {"lat": 48.8 + rng.random() / 10, "lon": 2.3 + rng.random() / 10},
+                "nodes": list(range(i * 10, i * 10 + 12)),
+                "tags": tags,
+            })
+    document = {"version": 0.6, "generator": "synthetic", "osm3s": {"copyright": "ODbL"}, "elements": items}
+    return json.dumps(document).encode("utf-8")
+
+
+def chunked(raw: bytes) -> Iterator[bytes]:
+    for start in range(0, len(raw), CHUNK_SIZE):
+        yield raw[start:start + CHUNK_SIZE]
+
+
+def overpy_path(raw: bytes) -> int:
+    import overpy
+
+    # The old path buffers the whole body before parsing it
+    body = b"".join(chunked(raw))
+    result = overpy.Overpass().parse_json(body)
+    places = []
+    for node in result.nodes:
+        places.append({"name": node.tags.get("name", "Unknown"), "location": [node.lat, node.lon],
+                       "tags": list(node.tags.items()), "osm_id": node.id, "osm_type": "node"})
+    for way in result.ways:
+        if way.center_lat is not None:
+            places.append({"name": way.tags.get("name", "Unknown"), "location": [way.center_lat, way.center_lon],
+                           "tags": list(way.tags.items()), "osm_id": way.id, "osm_type": "way"})
+    return len(places)
+
+
+def streaming_path(raw: bytes) -> int:
+    return len(list(iter_place_records(chunked(raw), PLACE_TAGS | {"amenity"})))
+
+
+def measure(name: str, fn: Callable[[bytes], int], raw: bytes) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = fn(raw)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10} {count:>9} places {elapsed:>8.2f}s  peak {peak / 2 ** 20:>8.1f} MiB (excluding the {len(raw) / 2 ** 20:.1f} MiB body)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", help="recorded Overpass JSON response")
+    parser.add_argument("--elements", type=int, default=200000, help="size of the synthetic response")
+    args = parser.parse_args()
+
+    fixture = args.fixture
+    if not fixture:
+        recorded = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*_legacy.json")), key=os.path.getsize)
+        fixture = recorded[-1] if recorded else None
+    if fixture:
+        with open(fixture, "rb") as f:
+            raw = f.read()
+        print(f"fixture {fixture}")
+    else:
+        raw = synthesize(args.elements)
+        print(f"synthetic response with {args.elements} elements")
+
+    measure("streaming", streaming_path, raw)
+    try:
+        measure("overpy", overpy_path, raw)
+    except ImportError:
+        print("overpy is not installed; skipping the overpy comparison")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compare the compact Overpass query builder with the original per-tag builder.
+
+Record real responses once (needs network access):
+
+    python -m benchmarks.overpass_query_benchmark --record
+
+then compare response size, server latency and local parse time from the
+recorded fixtures as often as you like:
+
+    python -m benchmarks.overpass_query_benchmark
+"""
+from typing import List, Optional
+import argparse
+import json
+import time
+import os
+from app.utils.api_wrappers import OSM_TAGS, OVERPASS_URL, build_overpass_query
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "overpass")
+
+CITIES = {
+    "paris": (48.8566, 2.3522),
+    "new_york": (40.7128, -74.0060),
+    "tokyo": (35.6762, 139.6503),
+}
+
+RADIUS = 5000
+
+
+def build_legacy_query(lat: float, lon: float, radius: int, kinds: Optional[List[str]] = None) -> str:
+    """The builder as it was before grouping: three statements per tag and `out body center`."""
+    if not kinds:
+        kinds = ["outdoors", "art", "history", "food"]
+
+    query_parts = []
+    for kind in kinds:
+        if kind in OSM_TAGS:
+            for tag_key, tag_value in OSM_TAGS[kind]:
+                query_parts.append(f"node[\"{tag_key}\"=\"{tag_value}\"](around:{radius},{lat},{lon});")
+                query_parts.append(f"way[\"{tag_key}\"=\"{tag_value}\"](around:{radius},{lat},{lon});")
+                query_parts.append(f"relation[\"{tag_key}\"=\"{tag_value}\"](around:{radius},{lat},{lon});")
+
+    return """
+[out:json][timeout:25];
+(
+    %s
+);
+out body center;
+""" % ("\n    ".join(query_parts))
+
+
+BUILDERS = {
+    "legacy": build_legacy_query,
+    "compact": build_overpass_query,
+}
+
+
+def record() -> None:
+    import requests
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for city, (lat, lon) in CITIES.items():
+        for name, builder in BUILDERS.items():
+            query = builder(lat, lon, RADIUS)
+            started = time.perf_counter()
+            response = requests.post(OVERPASS_URL, data=query.encode("utf-8"), timeout=(5, 120))
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            with open(os.path.join(FIXTURE_DIR, f"{city}_{name}.json"), "wb") as f:
+                f.write(response.content)
+            with open(os.path.join(FIXTURE_DIR, f"{city}_{name}.meta.json"), "w") as f:
+                json.dump({"query": query, "latency_s": elapsed}, f, indent=2)
+            print(f"recorded {city}/{name}: {len(response.content)} bytes in {elapsed:.2f}s")
+            # Stay polite to the public Overpass instance
+            time.sleep(2)
+
+
+def compare() -> None:
+    rows = []
+    for city in CITIES:
+        for name in BUILDERS:
+            path = os.path.join(FIXTURE_DIR, f"{city}_{name}.json")
+            if not os.path.exists(path):
+                print(f"missing fixture {path}; run with --record first")
+                return
+            with open(path, "rb") as f:
+                raw = f.read()
+            with open(os.path.join(FIXTURE_DIR, f"{city}_{name}.meta.json")) as f:
+                meta = json.load(f)
+
+            started = time.perf_counter()
+            elements = json.loads(raw)["elements"]
+            parse_s = time.perf_counter() - started
+            rows.append((city, name, len(raw), meta["latency_s"], parse_s, len(elements), meta["query"].count(";")))
+
+    print(f"{'city':<10} {'builder':<8} {'bytes':>12} {'server s':>9} {'parse ms':>9} {'elements':>9} {'stmts':>6}")
+    for city, name, size, latency, parse_s, count, statements in rows:
+        print(f"{city:<10} {name:<8} {size:>12,} {latency:>9.2f} {parse_s * 1000:>9.1f} {count:>9} {statements:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="fetch fresh fixtures from Overpass")
+    args = parser.parse_args()
+    if args.record:
+        record()
+    compare()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Memory per POI: a list of POI dataclasses versus a POITable, and per scheduled item.
+
+    python -m benchmarks.poi_memory_benchmark [--sizes 1000 10000 100000]
+
+POIs are built from the same synthetic places as poi_scoring_benchmark, and
+strings the places already hold (names, tag keys and values) are shared by
+both layouts, so the numbers are what each layout adds on top. Allocation is
+measured with tracemalloc. Scheduled items compare the dict the scheduler used
+to copy for every activity with the row-referencing visit it builds now.
+"""
+from typing import Any, Callable
+import argparse
+import random
+import tracemalloc
+from app.agents.poi_agent import POIAgent, POITable
+from benchmarks.poi_scoring_benchmark import CATEGORIES, make_places
+
+
+def allocated(build: Callable[[], Any]) -> int:
+    """Bytes still allocated by what build returns."""
+    tracemalloc.start()
+    try:
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="POI counts to store")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    agent = POIAgent("Benchmark", [list(tag) for tag in CATEGORIES[:8]])
+
+    print(f"{'POIs':>8} {'POI list':>14} {'POITable':>14} {'ratio':>6}")
+    for size in args.sizes:
+        places = make_places(size, rng)
+        for i, place in enumerate(places):
+            place.update(location=[48.8 + rng.random() / 10, 2.3 + rng.random() / 10], osm_id=i, osm_type="node")
+        candidates = list(agent._candidates(places))
+
+        as_list = allocated(lambda: [agent._to_poi(*candidate) for candidate in candidates])
+        pois = [agent._to_poi(*candidate) for candidate in candidates]
+        as_table = allocated(lambda: POITable(pois))
+        print(f"{size:>8} {as_list / size:>10.0f} B/POI {as_table / size:>8.0f} B/POI {as_list / as_table:>5.1f}x")
+
+    table = POITable(pois)
+    count = min(len(table), 10000)
+    copied = allocated(lambda: [dict(table.record(row), start_time=9, end_time=11, duration=120) for row in range(count)])
+    visits = allocated(lambda: [{"poi": row, "start_time": 9, "end_time": 11, "duration": 120} for row in range(count)])
+    print(f"scheduled item: copied fields {copied / count:.0f} B, row reference {visits / count:.0f} B")
+
+
+if __name__ == "__main__":
+    main()
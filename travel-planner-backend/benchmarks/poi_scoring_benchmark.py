@@ -0,0 +1,169 @@
+"""
+POIAgent scoring and selection versus the old nested string loops and full sort.
+
+    python -m benchmarks.poi_scoring_benchmark [--sizes 10000 100000] [--user-tags 8]
+
+Places are synthetic but shaped like Overpass results: a category tag or two
+plus a few of the detail tags the pipeline keeps. The old code is reproduced
+as it was: get_pois compared a "key=value" string per user tag x POI tag and
+built a POI for every place before sorting them all to keep the top 20, and
+_score_poi rebuilt the user tag strings for every POI tag. Both versions
+are checked to give identical scores, themes and top 20; get_pois is also
+measured for peak allocated memory (tracemalloc, places themselves excluded).
+"""
+from typing import Any, Dict, List, Tuple
+import argparse
+import random
+import time
+import tracemalloc
+from app.agents.poi_agent import POI, POIAgent
+
+CATEGORIES = [
+    ("amenity", "restaurant"), ("amenity", "cafe"), ("amenity", "bar"), ("amenity", "fast_food"),
+    ("amenity", "museum"), ("amenity", "theatre"), ("amenity", "cinema"), ("amenity", "library"),
+    ("tourism", "museum"), ("tourism", "attraction"), ("tourism", "gallery"), ("tourism", "viewpoint"),
+    ("leisure", "park"), ("leisure", "garden"), ("leisure", "stadium"), ("historic", "monument"),
+    ("historic", "castle"), ("building", "church"), ("shop", "mall"), ("natural", "peak")
+]
+DETAILS = [("cuisine", "french"), ("cuisine", "italian"), ("opening_hours", "Mo-Su 09:00-18:00"),
+           ("website", "https://example.org"), ("rating", "4.5"), ("price", "20")]
+
+
+def make_places(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    places = []
+    for i in range(count):
+        tags = rng.sample(CATEGORIES, rng.randint(1, 2)) + rng.sample(DETAILS, rng.randint(1, 4))
+        description = "A lovely museum in the park" if rng.random() < 0.1 else ""
+        places.append({"name": f"Place {i}", "description": description, "tags": tags})
+    return places
+
+
+def legacy_relevance(osm_tags: List[List[str]], tags: List[Tuple[str, str]]) -> float:
+    score = 0.0
+    for user_tag in osm_tags:
+        user_key_value = f"{user_tag[0]}={user_tag[1]}"
+        for poi_tag in tags:
+            poi_key_value = f"{poi_tag[0]}={poi_tag[1]}"
+            if user_key_value == poi_key_value:
+                score += 1.0
+            elif user_tag[0] == poi_tag[0]:
+                score += 0.5
+    return score
+
+
+def legacy_theme(tag_to_theme: Dict[str, str], tags: List[Tuple[str, str]]) -> str:
+    themes = set()
+    for tag in tags:
+        key_value = f"{tag[0]}={tag[1]}"
+        if key_value in tag_to_theme:
+            themes.add(tag_to_theme[key_value])
+        if tag[0] == "amenity" and tag[1] in ["restaurant", "cafe", "bar"]:
+            themes.add("food")
+        elif tag[0] == "building" and tag[1] in ["church", "mosque", "temple"]:
+            themes.add("architecture")
+        elif tag[0] == "shop" and tag[1] in ["mall", "retail"]:
+            themes.add("shopping")
+        elif tag[0] == "leisure" and tag[1] in ["park", "sports_centre", "stadium"]:
+            themes.add("nature")
+            themes.add("sports")
+        elif tag[0] == "natural" and tag[1] in ["wood", "water"]:
+            themes.add("nature")
+        elif tag[0] == "tourism" and tag[1] == "attraction":
+            themes.add("adventure")
+    return sorted(themes)[0] if themes else "unknown"
+
+
+def legacy_score_poi(agent: POIAgent, poi: Dict[str, Any]) -> Tuple[float, str]:
+    description = poi.get('description', '').lower()
+    base_score = 0.0
+    for tag_key, tag_value in poi.get('tags', []):
+        key_value = f"{tag_key}={tag_value}"
+        if any(f"{t[0]}={t[1]}" == key_value for t in agent.osm_tags):
+            base_score += 0.5
+        if tag_value.lower() in description:
+            base_score += 0.3
+        if key_value in agent.tag_to_theme:
+            if agent.tag_to_theme[key_value] in agent.themes:
+                base_score += 0.2
+    return min(1.0, base_score), legacy_theme(agent.tag_to_theme, poi.get('tags', []))
+
+
+def legacy_get_pois(agent: POIAgent, raw_pois: List[Dict[str, Any]], max_results: int) -> List[POI]:
+    pois = []
+    for raw_poi in raw_pois:
+        tags = [(k, v) for k, v in raw_poi.get('tags', [])]
+        score = legacy_relevance(agent.osm_tags, tags)
+        rating = None
+        price = None
+        for k, v in raw_poi.get('tags', []):
+            if k == 'rating':
+                try:
+                    rating = float(v)
+                except ValueError:
+                    pass
+            elif k == 'price':
+                try:
+                    price = float(v)
+                except ValueError:
+                    pass
+        pois.append(POI(
+            name=raw_poi.get('name', 'Unknown'), description=raw_poi.get('description', ''),
+            location=(raw_poi.get('lat', 0.0), raw_poi.get('lon', 0.0)), type=tags[0][0] if tags else 'unknown',
+            tags=tags, osm_id=raw_poi.get('id', 0), osm_type=raw_poi.get('type', ''), relevance_score=score,
+            theme_score=score, tag_score=score, matched_theme=tags[0][0] if tags else '', rating=rating, price=price
+        ))
+    return sorted(pois, key=lambda p: p.relevance_score, reverse=True)[:max_results]
+
+
+def peak_memory(fn) -> int:
+    """Peak bytes allocated while fn runs."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def timed(fn) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="POI counts to score")
+    parser.add_argument("--user-tags", type=int, default=8, help="tags the agent is searching for")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    osm_tags = [list(tag) for tag in rng.sample(CATEGORIES, args.user_tags)]
+    agent = POIAgent("Benchmark", osm_tags)
+    agent.themes = {"culture", "food", "nature"}
+
+    print(f"{args.user_tags} user tags")
+    print(f"{'POIs':>8} {'step':>11} {'old':>10} {'new':>10} {'speedup':>8}  same")
+    for size in args.sizes:
+        places = make_places(size, rng)
+        tag_lists = [place["tags"] for place in places]
+
+        old, old_scores = timed(lambda: [legacy_relevance(osm_tags, tags) for tags in tag_lists])
+        new, new_scores = timed(lambda: [agent.matcher.relevance(tags) for tags in tag_lists])
+        print(f"{size:>8} {'relevance':>11} {old * 1000:>8.1f}ms {new * 1000:>8.1f}ms {old / new:>7.1f}x  {old_scores == new_scores}")
+
+        old, old_scores = timed(lambda: [legacy_score_poi(agent, place) for place in places])
+        new, new_scores = timed(lambda: [agent._score_poi(place) for place in places])
+        print(f"{size:>8} {'_score_poi':>11} {old * 1000:>8.1f}ms {new * 1000:>8.1f}ms {old / new:>7.1f}x  {old_scores == new_scores}")
+
+        old, old_pois = timed(lambda: legacy_get_pois(agent, places, 20))
+        new, new_pois = timed(lambda: agent.get_pois(max_results=20, raw_pois=iter(places)))
+        same = [(p.name, p.relevance_score) for p in old_pois] == [(p.name, p.relevance_score) for p in new_pois]
+        print(f"{size:>8} {'get_pois':>11} {old * 1000:>8.1f}ms {new * 1000:>8.1f}ms {old / new:>7.1f}x  {same}")
+        old = peak_memory(lambda: legacy_get_pois(agent, places, 20))
+        new = peak_memory(lambda: agent.get_pois(max_results=20, raw_pois=iter(places)))
+        print(f"{size:>8} {'peak memory':>11} {old / 1e6:>8.1f}MB {new / 1e6:>8.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
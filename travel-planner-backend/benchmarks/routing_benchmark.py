@@ -0,0 +1,72 @@
+"""
+Cost and quality of ItineraryAgent's activity routing.
+
+    python -m benchmarks.routing_benchmark [--candidates 200] [--days 5] [--repeat 20]
+
+Candidates are scattered uniformly over a ~10 km square around the hotel.
+Reports the time for a full _schedule_activities call (distance matrix plus a
+routed day for each of --days days), and for routing every candidate as one
+loop, the round-trip length in relevance order, after nearest neighbour and
+after 2-opt.
+"""
+from typing import List
+import argparse
+import random
+import time
+from app.agents.itinerary_agent import ItineraryAgent
+from app.agents.poi_agent import POI, POITable
+from app.utils.geo import haversine_matrix
+from app.utils.routing import nearest_neighbour, plan_route, route_length
+
+HOTEL = (48.8647, 2.2938)
+
+
+def make_pois(count: int, rng: random.Random) -> List[POI]:
+    return [
+        POI(
+            name=f"Place {i}", description="", type="tourism", tags=[("tourism", "museum")], osm_id=i, osm_type="node",
+            location=(HOTEL[0] + rng.uniform(-0.045, 0.045), HOTEL[1] + rng.uniform(-0.07, 0.07)),
+            relevance_score=rng.random(), theme_score=rng.random()
+        )
+        for i in range(count)
+    ]
+
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=200, help="activity candidates")
+    parser.add_argument("--days", type=int, default=5, help="days to schedule")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per timing (median reported)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    table = POITable(make_pois(args.candidates, rng))
+    agent = ItineraryAgent()
+    rows = range(len(table))
+    user_tags = [["tourism", "museum"]]
+
+    elapsed = median_ms(lambda: agent._schedule_activities(
+        table, rows, HOTEL, args.days, user_tags, [[] for _ in range(args.days)]
+    ), args.repeat)
+    print(f"_schedule_activities, {args.candidates} candidates, {args.days} days: {elapsed:.1f}ms")
+
+    dist = haversine_matrix([HOTEL[0], *table.lats], [HOTEL[1], *table.lons])
+    by_relevance = sorted(range(1, len(table) + 1), key=lambda node: -table.relevance_scores[node - 1])
+    print(f"one loop through all {args.candidates}:")
+    print(f"  {'relevance order':>17}: {route_length(dist, 0, by_relevance):8.1f} km")
+    print(f"  {'nearest neighbour':>17}: {route_length(dist, 0, nearest_neighbour(dist, 0, by_relevance)):8.1f} km")
+    print(f"  {'+ 2-opt':>17}: {route_length(dist, 0, plan_route(dist, 0, by_relevance)):8.1f} km"
+          f"  in {median_ms(lambda: plan_route(dist, 0, by_relevance), max(1, args.repeat // 4)):.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Cold-start cost of the backend: importing app.server and serving the first request.
+
+    python -m benchmarks.startup_benchmark [--runs 5] [--path /] [--no-credentials]
+
+Each run is a fresh interpreter, so nothing is already imported or cached. The
+first request goes through Flask's test client, so no port is opened. The
+report also lists which of the heavy client libraries ended up imported; with
+lazy initialization none of them should be until a request actually needs one.
+--no-credentials blanks GOOGLE_API_KEY to check the server still starts
+without it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["google.generativeai", "sentence_transformers", "torch", "geopy"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.server
+imported = time.perf_counter()
+client = app.server.app.test_client()
+status = client.get(sys.argv[1]).status_code
+first = time.perf_counter()
+client.get(sys.argv[1])
+second = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "first_request": first - imported,
+    "second_request": second - first,
+    "status": status,
+    "loaded": [name for name in sys.argv[2:] if name in sys.modules]
+}))
+"""
+
+
+def run_once(path: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, path, *HEAVY_MODULES],
+        capture_output=True, text=True, env=env, check=False
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"startup failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--path", default="/", help="path of the first request")
+    parser.add_argument("--no-credentials", action="store_true", help="start with GOOGLE_API_KEY blanked")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.no_credentials:
+        # Blank rather than unset, so load_dotenv() doesn't fill it back in from .env
+        env["GOOGLE_API_KEY"] = ""
+
+    runs = [run_once(args.path, env) for _ in range(args.runs)]
+    for name in ("import", "first_request", "second_request"):
+        timings = [run[name] * 1000 for run in runs]
+        print(f"{name:>15}: median {statistics.median(timings):8.1f}ms  min {min(timings):8.1f}ms  max {max(timings):8.1f}ms")
+    print(f"{'status':>15}: {runs[-1]['status']}")
+    print(f"{'heavy modules':>15}: {', '.join(runs[-1]['loaded']) or 'none loaded'}")
+
+
+if __name__ == "__main__":
+    main()